@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Hashable, Optional
+
+PBKDF2_ITERATIONS = 200_000
+
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+    return f"pbkdf2_sha256${iterations}${salt}${digest.hex()}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Check a password against a hash from ``hash_password``; CPU bound, run it off the event loop"""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except ValueError:
+        return False
+    if algorithm != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenSigner:
+    """
+    Issues and verifies stateless HS256 JWTs.
+
+    Verification is a single HMAC over the token, with no lookup, so any
+    worker sharing the same secret can check a token on every request.
+    """
+
+    _HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def __init__(self, secret: str, ttl: int = 8 * 3600):
+        self._key = secret.encode()
+        self.ttl = ttl
+
+    def issue(self, claims: dict, ttl: Optional[int] = None) -> str:
+        now = int(time.time())
+        payload = {**claims, "iat": now, "exp": now + (ttl or self.ttl)}
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        signing_input = f"{self._HEADER}.{body}"
+        return f"{signing_input}.{self._sign(signing_input)}"
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Return the token claims, or None if the token is malformed, forged or expired"""
+        try:
+            header, body, signature = token.split(".")
+        except ValueError:
+            return None
+        if header != self._HEADER:
+            return None
+        # compare_digest rejects non-ASCII str, so compare the encoded bytes
+        if not hmac.compare_digest(signature.encode(), self._sign(f"{header}.{body}").encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(body))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return claims
+
+    def _sign(self, signing_input: str) -> str:
+        return _b64encode(hmac.new(self._key, signing_input.encode(), hashlib.sha256).digest())
+
+
+class LoginThrottle:
+    """
+    Locks a client out after ``max_failures`` failed logins within ``window`` seconds.
+    ``client`` is any hashable key, e.g. ``(address, email)``.
+    """
+
+    def __init__(self, max_failures: int = 5, window: float = 300):
+        self.max_failures = max_failures
+        self.window = window
+        self._failures: dict = {}
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+
+    def retry_after(self, client: Hashable) -> float:
+        """Seconds until the client may try again, 0 if it is not locked out"""
+        with self._lock:
+            failures = self._prune(client)
+            if len(failures) < self.max_failures:
+                return 0
+            return max(failures[0] + self.window - time.monotonic(), 0)
+
+    def failed(self, client: Hashable):
+        with self._lock:
+            self._failures.setdefault(client, deque()).append(time.monotonic())
+            self._prune(client)
+            self._sweep()
+
+    def succeeded(self, client: Hashable):
+        with self._lock:
+            self._failures.pop(client, None)
+
+    def _sweep(self):
+        """Drop clients whose failures have all expired, at most once per window"""
+        now = time.monotonic()
+        if now - self._swept < self.window:
+            return
+        self._swept = now
+        for client in list(self._failures):
+            self._prune(client)
+
+    def _prune(self, client: Hashable) -> deque:
+        failures = self._failures.get(client)
+        if failures is None:
+            return deque()
+        cutoff = time.monotonic() - self.window
+        while failures and failures[0] < cutoff:
+            failures.popleft()
+        while len(failures) > self.max_failures:
+            failures.popleft()
+        if not failures:
+            del self._failures[client]
+        return failures
@@ -0,0 +1,187 @@
+"""
+Startup benchmark for the backend and the Streamlit pages.
+
+Measures, each in a fresh interpreter:
+- import time of the backend app (`import main`)
+- time from launching uvicorn to the first served request, plus the
+  latency of the first authenticated data request
+- cold run time of each Streamlit page script, logged out (mostly imports)
+  and logged in against a live backend on the port the pages call (8001),
+  which covers fetching and rendering the Dashboard charts
+
+Usage: python bench_startup.py [--runs 5] [--port 8765] [--warmup]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.path.join(BACKEND_DIR, "..", "frontend")
+PAGES = ["Login.py", "pages/Chat.py", "pages/Dashboard.py"]
+# The Streamlit pages talk to the backend at http://localhost:8001
+FRONTEND_API_PORT = 8001
+DEMO_LOGIN = {"email": "demo@aiva.com", "password": "demo123"}
+
+
+def run_python(code, env=None, cwd=BACKEND_DIR):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def bench_import(runs):
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    return [run_python(code) for _ in range(runs)]
+
+
+def request(url, data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json", **(headers or {})})
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def free_port(port):
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) != 0
+
+
+def start_backend(port, warmup=False):
+    """Launch uvicorn and wait for /health; returns the process and seconds until it answered"""
+    # The fake LLM provider keeps background insight jobs from spending API quota
+    env = {**os.environ, "WARMUP": "true" if warmup else "false", "LLM_PROVIDER": "fake", "GEMINI_API_KEY": ""}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    while True:
+        try:
+            request(f"http://127.0.0.1:{port}/health")
+            return server, time.perf_counter() - started
+        except OSError:
+            if server.poll() is not None or time.perf_counter() - started > 60:
+                server.terminate()
+                raise RuntimeError("backend did not start")
+            time.sleep(0.01)
+
+
+def wait_for_indexes(base, headers, timeout=120):
+    """Wait until /charts and /feedback/search stop answering 503"""
+    deadline = time.perf_counter() + timeout
+    for path in ("/charts", "/feedback/search?q=layanan"):
+        while True:
+            try:
+                request(f"{base}{path}", headers=headers)
+                break
+            except urllib.error.HTTPError as e:
+                if e.code != 503 or time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.05)
+
+
+def bench_first_request(port, warmup):
+    base = f"http://127.0.0.1:{port}"
+    launched = time.perf_counter()
+    server, first_request = start_backend(port, warmup)
+    try:
+        token = request(f"{base}/login", DEMO_LOGIN)["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        timings = {}
+        for path in ("/analytics", "/charts", "/feedback/search?q=layanan"):
+            t = time.perf_counter()
+            try:
+                request(f"{base}{path}", headers=headers)
+            except urllib.error.HTTPError as e:
+                # The index is still building in the background
+                if e.code != 503:
+                    raise
+            timings[path] = time.perf_counter() - t
+        wait_for_indexes(base, headers)
+        return first_request, time.perf_counter() - launched, timings
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_page(page, session=None):
+    """Run a page once in a fresh interpreter, with ``session`` preset in st.session_state"""
+    code = (
+        "import time; t = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"app = AppTest.from_file({page!r})\n"
+        f"for key, value in {session or {}!r}.items(): app.session_state[key] = value\n"
+        "app.run(timeout=60)\n"
+        "assert not app.exception and not app.error, [e.value for e in [*app.exception, *app.error]]\n"
+        "print(time.perf_counter() - t)"
+    )
+    return run_python(code, cwd=FRONTEND_DIR)
+
+
+def bench_pages_logged_in(runs):
+    """Page run times with a logged-in session against a live backend with its indexes built"""
+    base = f"http://127.0.0.1:{FRONTEND_API_PORT}"
+    server, _ = start_backend(FRONTEND_API_PORT)
+    try:
+        login = request(f"{base}/login", DEMO_LOGIN)
+        wait_for_indexes(base, {"Authorization": f"Bearer {login['access_token']}"})
+        session = {"logged_in": True, "user": login["user"], "token": login["access_token"]}
+        return {page: [bench_page(page, session) for _ in range(runs)] for page in PAGES}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(samples):
+    return f"median {statistics.median(samples) * 1000:.0f} ms, min {min(samples) * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--warmup", action="store_true", help="start the backend with WARMUP=true")
+    args = parser.parse_args()
+
+    print(f"backend import:        {summary(bench_import(args.runs))}")
+
+    if free_port(args.port):
+        first, ready, timings = [], [], {}
+        for _ in range(args.runs):
+            elapsed, indexes_ready, request_timings = bench_first_request(args.port, args.warmup)
+            first.append(elapsed)
+            ready.append(indexes_ready)
+            for path, seconds in request_timings.items():
+                timings.setdefault(path, []).append(seconds)
+        print(f"launch to first reply: {summary(first)}")
+        print(f"launch to indexes:     {summary(ready)}")
+        for path, samples in timings.items():
+            print(f"  first {path}: {summary(samples)}")
+    else:
+        print(f"port {args.port} is busy, skipping the server benchmark")
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("streamlit not installed, skipping page benchmarks")
+        return
+    for page in PAGES:
+        samples = [bench_page(page) for _ in range(args.runs)]
+        print(f"page {page + ':':<20} {summary(samples)} (logged out)")
+    if free_port(FRONTEND_API_PORT):
+        for page, samples in bench_pages_logged_in(args.runs).items():
+            print(f"page {page + ':':<20} {summary(samples)} (logged in)")
+    else:
+        print(f"port {FRONTEND_API_PORT} is busy, skipping the logged-in page benchmark")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import csv
+import io
+from typing import Iterable, Iterator, List
+
+EXPORT_COLUMNS = {
+    "customers": ["id", "name", "email", "status", "plan", "joined_date", "last_activity"],
+    "feedback": ["id", "user", "email", "rating", "comment", "category", "date", "status"],
+}
+
+INTEGER_COLUMNS = {"id", "rating"}
+
+CHUNK_ROWS = 5000
+
+
+def csv_chunks(rows: Iterable[dict], columns: List[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """Serialize rows to CSV, yielding one chunk of text per ``chunk_rows`` rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out and dropped as they arrive"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_chunks(rows: Iterable[dict], columns: List[str], fmt: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Serialize rows to Parquet (one row group per chunk) or an Arrow IPC stream.
+    Requires pyarrow, which is optional and imported on first use.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+        for column in columns
+    ])
+    sink = _DrainableSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    writer.close()
+    yield sink.drain()
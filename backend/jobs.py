@@ -0,0 +1,130 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class Job:
+    """A unit of background work and its outcome"""
+
+    def __init__(self, kind: str, key: Optional[tuple] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self, include_result: bool = False) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """
+    In-process async job queue.
+
+    Work functions are plain blocking callables; they run in the default
+    thread pool so the event loop keeps serving requests. At most
+    ``concurrency`` jobs run at the same time, the rest wait their turn.
+
+    Jobs submitted with a ``key`` are cached: submitting the same key again
+    returns the existing job (queued, running or done) instead of doing the
+    work twice. Failed jobs are not cached so they can be retried.
+    """
+
+    def __init__(self, concurrency: int = 2, max_jobs: int = 500):
+        self.concurrency = concurrency
+        self.max_jobs = max_jobs
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: dict = {}
+        self._tasks: set = set()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, key: Optional[tuple] = None) -> Job:
+        """Schedule ``fn(*args)``; must be called from the event loop"""
+        if key is not None:
+            existing = self._by_key.get(key)
+            if existing is not None and existing.status != "failed":
+                return existing
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        job = Job(kind, key)
+        self._jobs[job.id] = job
+        if key is not None:
+            self._by_key[key] = job
+        self._evict()
+
+        task = asyncio.get_running_loop().create_task(self._run(job, fn, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def lookup(self, key: tuple) -> Optional[Job]:
+        return self._by_key.get(key)
+
+    async def wait(self, job: Job, timeout: Optional[float] = None) -> bool:
+        """Wait for a job to finish; returns False on timeout"""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"concurrency": self.concurrency, "jobs": counts}
+
+    async def _run(self, job: Job, fn: Callable[..., Any], args: tuple):
+        async with self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await asyncio.to_thread(fn, *args)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+
+    def _evict(self):
+        # Drop the oldest finished jobs once we hold more than max_jobs
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            job = self._jobs[job_id]
+            if not job.finished:
+                continue
+            del self._jobs[job_id]
+            if job.key is not None and self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
@@ -0,0 +1,314 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# HTTP-style status codes that are worth retrying
+TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+# The model is retired or off limits to this key; the next model may still answer
+MODEL_CODES = {403, 404}
+# The provider rejected our credentials; that's our fault, not the client's
+AUTH_CODES = {401, 403}
+
+
+@dataclass
+class LLMResult:
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    attempts: int = 1
+
+
+class LLMError(Exception):
+    """Raised when no model in the fallback chain produced an answer, or the request was rejected"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status in `code`
+    return error_code(error) in TRANSIENT_CODES
+
+
+def error_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def client_status(error: Exception) -> int:
+    """HTTP status to report for a non-transient error: 502 for provider auth failures, else 400 (the prompt was rejected)"""
+    return 502 if error_code(error) in AUTH_CODES else 400
+
+
+class GeminiProvider:
+    """Calls Gemini; the SDK is slow to import, so it is loaded on first use"""
+
+    def __init__(self, api_key: str = ""):
+        self.api_key = api_key
+        self._genai = None
+        self._lock = threading.Lock()
+
+    def warmup(self):
+        self._client()
+
+    def _client(self):
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+
+                    if self.api_key:
+                        genai.configure(api_key=self.api_key)
+                    self._genai = genai
+        return self._genai
+
+    def generate(self, model: str, prompt: str, config: dict, timeout: float) -> LLMResult:
+        response = self._client().GenerativeModel(model).generate_content(
+            prompt,
+            generation_config=config,
+            request_options={"timeout": timeout},
+        )
+        metadata = getattr(response, "usage_metadata", None)
+        return LLMResult(
+            text=response.text.strip(),
+            model=model,
+            prompt_tokens=getattr(metadata, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(metadata, "candidates_token_count", 0) or 0,
+        )
+
+
+class FakeProvider:
+    """
+    Local stand-in for Gemini, for development and tests.
+    Sleeps ``latency`` seconds and fails with a transient error at ``failure_rate``.
+    """
+
+    def __init__(self, latency: float = 0.05, failure_rate: float = 0.0, failing_models=()):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failing_models = set(failing_models)
+
+    def generate(self, model: str, prompt: str, config: dict, timeout: float) -> LLMResult:
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise TimeoutError(f"{model} timed out")
+        if model in self.failing_models or random.random() < self.failure_rate:
+            raise ConnectionError(f"{model} unavailable")
+        return LLMResult(
+            text=f"[{model}] {prompt.strip().splitlines()[-1][:200]}",
+            model=model,
+            prompt_tokens=len(prompt) // 4,
+            output_tokens=16,
+        )
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model after ``failure_threshold`` consecutive transient
+    failures. After ``reset_timeout`` seconds one trial call is let through;
+    its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class ResilientLLM:
+    """
+    Wraps a provider with a per-call deadline, jittered exponential retries
+    on transient errors, optional hedging, a circuit breaker per model and a
+    fallback chain of models. A model that is retired or forbidden (404/403)
+    is skipped without retrying; other non-transient errors are raised at
+    once as an ``LLMError``: 502 if the provider refused our credentials,
+    400 if it rejected the prompt.
+
+    Hedging: once a model has ``hedge_min_samples`` latency samples, an
+    attempt still running after that model's p95 latency gets a duplicate
+    request and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        provider,
+        fallbacks: Optional[Dict[str, List[str]]] = None,
+        deadline: float = 25,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 4,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        max_workers: int = 16,
+    ):
+        self.provider = provider
+        self.fallbacks = fallbacks or {}
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.RLock()
+
+    def chain(self, model: str) -> List[str]:
+        return [model] + [m for m in self.fallbacks.get(model, []) if m != model]
+
+    def generate(self, model: str, prompt: str, config: dict, deadline: Optional[float] = None) -> LLMResult:
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempts = 0
+        last_error: Optional[Exception] = None
+        open_circuits = []
+
+        for candidate in self.chain(model):
+            breaker = self._breaker(candidate)
+            for retry in range(self.max_retries + 1):
+                remaining = expires - time.monotonic()
+                if remaining <= 0:
+                    raise LLMError(f"LLM deadline exceeded after {attempts} attempts: {last_error}", 504)
+                if not breaker.allow():
+                    if retry == 0:
+                        open_circuits.append(candidate)
+                    break
+
+                attempts += 1
+                started = time.monotonic()
+                try:
+                    result = self._attempt(candidate, prompt, config, remaining)
+                except Exception as e:
+                    last_error = e
+                    if error_code(e) in MODEL_CODES:
+                        # This model is gone or off limits; retrying it won't
+                        # help, but the next model in the chain might answer
+                        breaker.record(ok=True)
+                        break
+                    if not is_transient(e):
+                        # The service answered and rejected the request (bad
+                        # prompt, credentials...); another model or another try
+                        # won't help, and it doesn't count against the breaker
+                        breaker.record(ok=True)
+                        raise LLMError(f"{candidate} rejected the request: {e}", client_status(e)) from e
+                    breaker.record(ok=False)
+                    if retry < self.max_retries:
+                        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+                        time.sleep(max(min(delay, expires - time.monotonic()), 0))
+                    continue
+
+                breaker.record(ok=True)
+                self._record_latency(candidate, time.monotonic() - started)
+                result.attempts = attempts
+                return result
+
+        if time.monotonic() >= expires:
+            raise LLMError(f"LLM deadline exceeded after {attempts} attempts: {last_error}", 504)
+        if last_error is None and open_circuits:
+            raise LLMError(f"Models temporarily unavailable (circuit open): {', '.join(open_circuits)}", 503)
+        raise LLMError(f"All models failed after {attempts} attempts: {last_error}", 502)
+
+    def warmup(self):
+        """Load the provider's SDK ahead of the first call, if it has one"""
+        warmup = getattr(self.provider, "warmup", None)
+        if warmup is not None:
+            warmup()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    "circuit": self._breakers[model].state if model in self._breakers else "closed",
+                    "p95_latency": self._p95(model),
+                    "samples": len(self._latencies.get(model, ())),
+                }
+                for model in set(self._breakers) | set(self._latencies)
+            }
+
+    def _attempt(self, model: str, prompt: str, config: dict, timeout: float) -> LLMResult:
+        expires = time.monotonic() + timeout
+        futures = [self._executor.submit(self.provider.generate, model, prompt, config, timeout)]
+        hedge_at = None
+        if self.hedge:
+            p95 = self._p95(model)
+            if p95 is not None:
+                hedge_at = time.monotonic() + p95
+
+        while True:
+            now = time.monotonic()
+            if now >= expires:
+                raise TimeoutError(f"{model} did not answer within {timeout:.1f}s")
+            wake = min(expires, hedge_at) if hedge_at else expires
+            done, _ = wait(futures, timeout=max(wake - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    return future.result()
+                if not futures:
+                    raise future.exception()
+            if hedge_at and time.monotonic() >= hedge_at:
+                hedge_at = None
+                remaining = expires - time.monotonic()
+                futures.append(self._executor.submit(self.provider.generate, model, prompt, config, remaining))
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def _record_latency(self, model: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=200)).append(seconds)
+
+    def _p95(self, model: str) -> Optional[float]:
+        with self._lock:
+            samples = self._latencies.get(model)
+            if not samples or len(samples) < self.hedge_min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
@@ -1,15 +1,100 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import AfterValidator, BaseModel, Field, ValidationError, field_validator
+from collections import Counter
+from contextlib import asynccontextmanager
+import asyncio
 import json
 import os
-from typing import Optional, List
-import google.generativeai as genai
+import secrets
+from datetime import date, datetime
+import threading
+import time
+from typing import Annotated, Optional, List
 from dotenv import load_dotenv
 
+from auth import LoginThrottle, TokenSigner, verify_password
+from export import EXPORT_COLUMNS, arrow_chunks, csv_chunks
+from jobs import JobQueue
+from llm import FakeProvider, GeminiProvider, LLMError, ResilientLLM
+from ratelimit import RateLimiter, UsageMeter
+from search import FeedbackIndex
+from series import GRANULARITIES, MAX_DATE, MIN_DATE, ChartSeries
+from store import DataStore
+
 load_dotenv()
 
-app = FastAPI(title="AIVA Lite API", version="1.0.0")
+INSIGHTS_MODEL = os.getenv("INSIGHTS_MODEL", "gemini-2.0-flash-exp")
+INSIGHTS_POLL_SECONDS = float(os.getenv("INSIGHTS_POLL_SECONDS", "30"))
+# Regenerate an insight at most this often, however often the data changes
+INSIGHTS_MIN_INTERVAL = float(os.getenv("INSIGHTS_MIN_INTERVAL", "300"))
+# A failed generation is retried after this many seconds instead
+INSIGHTS_RETRY_SECONDS = float(os.getenv("INSIGHTS_RETRY_SECONDS", "30"))
+# Rows quoted verbatim in an insight prompt; the rest is summarised as counts
+INSIGHTS_SAMPLE_SIZE = 40
+
+job_queue = JobQueue(concurrency=int(os.getenv("JOB_CONCURRENCY", "2")))
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data.json")
+store = DataStore(DATA_PATH, compact_every=int(os.getenv("WAL_COMPACT_EVERY", "10000")))
+
+class Background:
+    """Builds ``factory()`` in a background thread; ``get()`` returns None until it is ready"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self._build, name=self.name, daemon=True).start()
+
+    def get(self):
+        return self.instance
+
+    def _build(self):
+        try:
+            self.instance = self.factory()
+        except Exception as e:
+            self.error = str(e)
+
+# Built at startup in the background, without holding the store lock;
+# until then their endpoints answer 503 instead of stalling requests
+chart_series = Background("chart-series", lambda: ChartSeries(store))
+feedback_index = Background("feedback-index", lambda: FeedbackIndex(store))
+
+def ready_or_503(index):
+    instance = index.get()
+    if instance is None and index.error is not None:
+        # The build failed and won't be retried; waiting won't help
+        raise HTTPException(status_code=500, detail=f"{index.name} failed to build: {index.error}")
+    if instance is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{index.name} is still being built, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    return instance
+
+# WARMUP=true also loads the LLM SDK in the background right after startup,
+# so the first chat request doesn't pay for the import
+WARMUP = os.getenv("WARMUP", "false").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    chart_series.start()
+    feedback_index.start()
+    watcher = asyncio.create_task(watch_data())
+    warming = asyncio.create_task(asyncio.to_thread(llm_client.warmup)) if WARMUP and LLM_CONFIGURED else None
+    yield
+    watcher.cancel()
+    if warming:
+        await warming
+    store.compact()
+
+app = FastAPI(title="AIVA Lite API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,14 +104,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tokens are signed with AUTH_SECRET; set the same value on every worker
+# or tokens issued by one worker will be rejected by the others
+AUTH_SECRET = os.getenv("AUTH_SECRET") or secrets.token_urlsafe(32)
+if AUTH_SECRET == "change_me_to_a_long_random_string":
+    raise RuntimeError("AUTH_SECRET is still the .env.example placeholder; set it to a long random string")
+token_signer = TokenSigner(
+    AUTH_SECRET,
+    ttl=int(os.getenv("AUTH_TOKEN_TTL", str(8 * 3600))),
+)
+# Download links can't send headers, so /export also takes a token in the
+# query string; those tokens only work for exports and expire with the session
+login_throttle = LoginThrottle(
+    max_failures=int(os.getenv("LOGIN_MAX_FAILURES", "5")),
+    window=float(os.getenv("LOGIN_LOCKOUT_SECONDS", "300")),
+)
+# Only these peers (the Streamlit server) may report the browser's address
+TRUSTED_PROXIES = {host.strip() for host in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if host.strip()}
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+
+# LLM_PROVIDER=fake answers locally without calling Gemini (development and testing)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_CONFIGURED = bool(GEMINI_API_KEY) or LLM_PROVIDER == "fake"
+
+# Models /chat may be asked for; anything else is rejected before rate limiting
+SUPPORTED_MODELS = ("gemini-2.0-flash-exp", "gemini-1.5-pro", "gemini-1.5-flash")
+
+def normalize_model(name):
+    """Canonical model name ("models/Gemini-1.5-Pro " -> "gemini-1.5-pro"), or None if unsupported"""
+    name = (name or "").strip().lower()
+    if name.startswith("models/"):
+        name = name[len("models/"):]
+    return name if name in SUPPORTED_MODELS else None
+
+# Models tried, in order, when the requested one keeps failing
+MODEL_FALLBACKS = {
+    "gemini-2.0-flash-exp": ["gemini-1.5-flash"],
+    "gemini-1.5-pro": ["gemini-1.5-flash"],
+}
+
+llm_client = ResilientLLM(
+    FakeProvider() if LLM_PROVIDER == "fake" else GeminiProvider(GEMINI_API_KEY),
+    fallbacks=MODEL_FALLBACKS,
+    deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "25")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    hedge=os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes"),
+)
 
 def load_data():
-    data_path = os.path.join(os.path.dirname(__file__), "data.json")
-    with open(data_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return store.snapshot()
+
+def data_version():
+    """Identify the current data snapshot; changes on every write to the store"""
+    return str(store.version)
+
+def generate_text(model_name, prompt, max_output_tokens=1024, user="system"):
+    """Call the LLM through the resilient client and record the token usage against `user`"""
+    try:
+        result = llm_client.generate(
+            model_name,
+            prompt,
+            {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "top_k": 40,
+                "max_output_tokens": max_output_tokens,
+            }
+        )
+    except LLMError:
+        usage_meter.record(user, model_name, error=True)
+        raise
+    usage_meter.record(
+        user,
+        result.model,
+        prompt_tokens=result.prompt_tokens,
+        output_tokens=result.output_tokens,
+    )
+    return result
 
 class ChatRequest(BaseModel):
     question: str
@@ -35,6 +190,73 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     context_used: bool
+    model: Optional[str] = None
+
+def iso_date(value: str) -> str:
+    """Accept YYYY-MM-DD dates within the range the charts plot"""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("must be a date in YYYY-MM-DD format")
+    if not MIN_DATE <= day <= MAX_DATE:
+        raise ValueError(f"must be between {MIN_DATE} and {MAX_DATE}")
+    return day.isoformat()
+
+IsoDate = Annotated[str, AfterValidator(iso_date)]
+
+class CustomerIn(BaseModel):
+    name: str
+    email: str
+    status: str = "Active"
+    plan: str = "Basic"
+    joined_date: Optional[IsoDate] = None
+    last_activity: Optional[IsoDate] = None
+
+def not_null(cls, value):
+    """PATCH fields may be left out, but not cleared if the record requires them"""
+    if value is None:
+        raise ValueError("may be omitted but not null")
+    return value
+
+class CustomerPatch(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
+    plan: Optional[str] = None
+    joined_date: Optional[IsoDate] = None
+    last_activity: Optional[IsoDate] = None
+
+    check_required = field_validator("name", "email", "status", "plan")(not_null)
+
+class FeedbackIn(BaseModel):
+    user: str
+    email: str
+    rating: int = Field(ge=1, le=5)
+    comment: str
+    category: str
+    date: IsoDate
+    status: str = "Pending"
+
+class FeedbackPatch(BaseModel):
+    user: Optional[str] = None
+    email: Optional[str] = None
+    rating: Optional[int] = Field(default=None, ge=1, le=5)
+    comment: Optional[str] = None
+    category: Optional[str] = None
+    date: Optional[IsoDate] = None
+    status: Optional[str] = None
+
+    check_required = field_validator("user", "email", "rating", "comment", "category", "date", "status")(not_null)
+
+# Imports may carry ids and replace existing records; POST always adds a new one
+class CustomerImport(CustomerIn):
+    id: Optional[int] = None
+
+class FeedbackImport(FeedbackIn):
+    id: Optional[int] = None
+
+IMPORT_MODELS = {"customers": CustomerImport, "feedback": FeedbackImport}
+IMPORT_BATCH_SIZE = 1000
 
 class LoginRequest(BaseModel):
     email: str
@@ -44,58 +266,303 @@ class LoginResponse(BaseModel):
     success: bool
     message: str
     user: Optional[dict] = None
+    access_token: Optional[str] = None
+    token_type: Optional[str] = None
 
-# Dummy users for authentication
+# Dummy users for authentication (passwords: admin123, demo123)
 USERS = {
-    "admin@aiva.com": {"password": "admin123", "name": "Admin User", "role": "admin"},
-    "demo@aiva.com": {"password": "demo123", "name": "Demo User", "role": "user"},
+    "admin@aiva.com": {
+        "password_hash": "pbkdf2_sha256$200000$ddd59e39391080668182914c60a06312$b93ab804a537cf0634081fa36d52c033172eb37a97bf0fd1b8218fc68a4fab28",
+        "name": "Admin User",
+        "role": "admin",
+    },
+    "demo@aiva.com": {
+        "password_hash": "pbkdf2_sha256$200000$31571eb07cef1353e5ba9a1a2db4519c$03bbad6a09ed7aab03302387ead6d51fef6484697b74f7f7ecad2e49a1b417c8",
+        "name": "Demo User",
+        "role": "user",
+    },
+}
+
+# LLM rate limits per role and model: (requests per minute, burst).
+# "*" applies to models without their own entry.
+LLM_RATE_LIMITS = {
+    "admin": {"*": (30, 10)},
+    "user": {"*": (10, 5), "gemini-1.5-pro": (4, 2)},
 }
 
+llm_limiter = RateLimiter(LLM_RATE_LIMITS)
+usage_meter = UsageMeter()
+
+# Checked for unknown emails so they take as long as a wrong password
+DUMMY_PASSWORD_HASH = "pbkdf2_sha256$200000$dc2d993d00f0d7ffa2c5fa375e59141d$22f625f9b41d5029f3cc80adc51fc9f60ca31eb533ee0f4043d014543903a589"
+
+def unauthorized():
+    return HTTPException(
+        status_code=401,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def bearer_claims(request: Request):
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() != "bearer ":
+        return None
+    claims = token_signer.verify(authorization[7:])
+    # Scoped tokens (e.g. export links) are not session tokens
+    if claims is None or "scope" in claims:
+        return None
+    return claims
+
+async def current_user(request: Request):
+    """Verify the bearer token from the Authorization header"""
+    claims = bearer_claims(request)
+    if claims is None:
+        raise unauthorized()
+    return claims
+
+async def export_user(request: Request):
+    """Verify the bearer token, or an export-scoped `access_token` query parameter for download links"""
+    claims = bearer_claims(request)
+    if claims is None:
+        claims = token_signer.verify(request.query_params.get("access_token", ""))
+        if claims is None or claims.get("scope") != "export":
+            raise unauthorized()
+    return claims
+
+async def require_admin(user: dict = Depends(current_user)):
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return user
+
 @app.get("/")
 def root():
     return {
         "message": "Welcome to AIVA Lite API",
         "version": "1.0.0",
-        "endpoints": ["/chat", "/analytics", "/customers", "/feedback", "/login"]
+        "endpoints": ["/chat", "/analytics", "/customers", "/feedback", "/login", "/insights", "/jobs", "/export", "/charts"]
     }
 
+def client_address(request: Request) -> str:
+    """The browser's address; the Streamlit server forwards it in X-Forwarded-For"""
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if peer in TRUSTED_PROXIES and forwarded:
+        return forwarded.split(",")[-1].strip() or peer
+    return peer
+
 @app.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest):
+async def login(request: LoginRequest, http_request: Request):
+    # Count failures per browser address and account, so a stranger can't
+    # lock a user out by guessing their password
+    client = (client_address(http_request), request.email.lower())
+    retry_after = login_throttle.retry_after(client)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
     user = USERS.get(request.email)
-    if user and user["password"] == request.password:
+    password_hash = user["password_hash"] if user else DUMMY_PASSWORD_HASH
+    # Password hashing is deliberately slow; keep it off the event loop
+    valid = await asyncio.to_thread(verify_password, request.password, password_hash)
+    if user and valid:
+        login_throttle.succeeded(client)
+        profile = {"email": request.email, "name": user["name"], "role": user["role"]}
         return LoginResponse(
             success=True,
             message="Login successful",
-            user={"email": request.email, "name": user["name"], "role": user["role"]}
+            user=profile,
+            access_token=token_signer.issue({"sub": request.email, "name": user["name"], "role": user["role"]}),
+            token_type="bearer",
         )
+    login_throttle.failed(client)
     return LoginResponse(success=False, message="Invalid credentials")
 
-@app.get("/analytics")
+@app.get("/analytics", dependencies=[Depends(current_user)])
 def get_analytics():
     """Get analytics data"""
-    data = load_data()
-    return data.get("analytics", {})
+    return store.analytics()
+
+@app.get("/charts", dependencies=[Depends(current_user)])
+def get_charts(granularity: str = "month", points: int = Query(200, ge=1, le=5000)):
+    """Ready-to-plot histograms and time series, downsampled to at most `points` points"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    series = ready_or_503(chart_series)
+    return {
+        "histograms": series.histograms(),
+        "timeseries": series.timeseries(granularity, points),
+    }
+
+def customer_filters(status: Optional[str] = None, plan: Optional[str] = None):
+    return {"status": status, "plan": plan}
+
+def feedback_filters(status: Optional[str] = None, category: Optional[str] = None, rating: Optional[int] = None):
+    return {"status": status, "category": category, "rating": rating}
 
-@app.get("/customers")
-def get_customers():
-    """Get all customers"""
-    data = load_data()
-    return data.get("customers", [])
+@app.get("/customers", dependencies=[Depends(current_user)])
+def get_customers(filters: dict = Depends(customer_filters), limit: Optional[int] = Query(None, ge=1)):
+    """Get all customers, or with `limit` only the most recently added ones"""
+    return store.rows("customers", filters, limit)
 
-@app.get("/feedback")
-def get_feedback():
-    """Get all feedback"""
-    data = load_data()
-    return data.get("feedback", [])
+@app.post("/customers", status_code=201, dependencies=[Depends(require_admin)])
+def create_customer(customer: CustomerIn):
+    """Add a customer"""
+    return store.insert("customers", customer.model_dump())
+
+@app.patch("/customers/{customer_id}", dependencies=[Depends(require_admin)])
+def update_customer(customer_id: int, changes: CustomerPatch):
+    """Update fields of a customer"""
+    customer = store.update("customers", customer_id, changes.model_dump(exclude_unset=True))
+    if customer is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
+
+@app.get("/feedback", dependencies=[Depends(current_user)])
+def get_feedback(filters: dict = Depends(feedback_filters), limit: Optional[int] = Query(None, ge=1)):
+    """Get all feedback, or with `limit` only the most recently added entries"""
+    return store.rows("feedback", filters, limit)
+
+@app.get("/feedback/search", dependencies=[Depends(current_user)])
+def search_feedback(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    filters: dict = Depends(feedback_filters),
+):
+    """
+    Full-text search over feedback comment, category and user, best matches first.
+    End a word with * for a prefix search, e.g. `lamb*`.
+    """
+    return ready_or_503(feedback_index).search(q, limit=limit, offset=offset, filters=filters)
+
+@app.post("/feedback", status_code=201, dependencies=[Depends(require_admin)])
+def create_feedback(feedback: FeedbackIn):
+    """Add a feedback entry"""
+    return store.insert("feedback", feedback.model_dump())
+
+@app.patch("/feedback/{feedback_id}", dependencies=[Depends(require_admin)])
+def update_feedback(feedback_id: int, changes: FeedbackPatch):
+    """Update fields of a feedback entry"""
+    feedback = store.update("feedback", feedback_id, changes.model_dump(exclude_unset=True))
+    if feedback is None:
+        raise HTTPException(status_code=404, detail="Feedback not found")
+    return feedback
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+def export_response(table, filters, format):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    rows = store.scan(table, filters)
+    columns = EXPORT_COLUMNS[table]
+    if format == "csv":
+        chunks = csv_chunks(rows, columns)
+    else:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="pyarrow is required for Parquet/Arrow export")
+        chunks = arrow_chunks(rows, columns, format)
+    filename = f"{table}_{datetime.now().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.post("/export/token")
+async def create_export_token(user: dict = Depends(current_user)):
+    """Issue a token for download links, accepted only by /export/* and valid as long as the session"""
+    expires_in = max(int(user["exp"] - time.time()), 1)
+    token = token_signer.issue({"sub": user["sub"], "role": user["role"], "scope": "export"}, ttl=expires_in)
+    return {"access_token": token, "token_type": "bearer", "expires_in": expires_in}
+
+@app.get("/export/customers", dependencies=[Depends(export_user)])
+def export_customers(filters: dict = Depends(customer_filters), format: str = "csv"):
+    """Stream customers as CSV, Parquet or Arrow, with the same filters as /customers"""
+    return export_response("customers", filters, format)
+
+@app.get("/export/feedback", dependencies=[Depends(export_user)])
+def export_feedback(filters: dict = Depends(feedback_filters), format: str = "csv"):
+    """Stream feedback as CSV, Parquet or Arrow, with the same filters as /feedback"""
+    return export_response("feedback", filters, format)
+
+@app.post("/import/{table}", dependencies=[Depends(require_admin)])
+async def import_ndjson(table: str, request: Request):
+    """
+    Bulk import customers or feedback from an NDJSON body (one record per line).
+    Records are validated and written in batches; invalid lines are skipped and reported.
+    """
+    model = IMPORT_MODELS.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    line_no = 0
+    buffer = b""
+
+    async def flush():
+        nonlocal imported, batch
+        if batch:
+            written = await asyncio.to_thread(store.put_many, table, batch)
+            imported += len(written)
+            batch = []
+
+    def parse(line):
+        nonlocal failed
+        try:
+            batch.append(model.model_validate_json(line).model_dump())
+        except ValidationError as e:
+            failed += 1
+            if len(errors) < 100:
+                errors.append({"line": line_no, "error": e.errors(include_url=False)[0]["msg"]})
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                parse(line)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    if buffer.strip():
+        line_no += 1
+        parse(buffer)
+    await flush()
+
+    return {"imported": imported, "failed": failed, "errors": errors}
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+def chat(request: ChatRequest, user: dict = Depends(current_user)):
     """
     AI Chat endpoint with company data context
     """
-    if not GEMINI_API_KEY:
+    if not LLM_CONFIGURED:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
     
+    model = normalize_model(request.model)
+    if model is None:
+        raise HTTPException(status_code=400, detail=f"model must be one of {', '.join(SUPPORTED_MODELS)}")
+    
+    retry_after = llm_limiter.acquire(user["sub"], user["role"], model)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded for this model, please slow down",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    
     try:
         company_data = load_data()
         
@@ -133,29 +600,195 @@ User Question: {request.question}
 """
         
         # Call Gemini API
-        model = genai.GenerativeModel(request.model)
-        response = model.generate_content(
-            context,
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 40,
-                "max_output_tokens": 1024,
-            }
-        )
-        
-        answer = response.text.strip()
+        result = generate_text(model, context, user=user["sub"])
         
-        return ChatResponse(answer=answer, context_used=True)
+        return ChatResponse(answer=result.text, context_used=True, model=result.model)
     
+    except LLMError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"Error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+# AI insights, generated in the background from aggregates and a small sample of rows
+
+def churn_insight():
+    analytics = store.analytics()
+    inactive = [c for c in store.rows("customers") if c.get("status") != "Active"]
+    by_plan = Counter(c.get("plan") for c in inactive)
+    by_last_activity = Counter(str(c.get("last_activity") or "unknown")[:7] for c in inactive)
+    by_joined = Counter(str(c.get("joined_date") or "unknown")[:4] for c in inactive)
+    recent = sorted(inactive, key=lambda c: str(c.get("last_activity") or ""), reverse=True)
+    sample = [
+        {"plan": c.get("plan"), "joined_date": c.get("joined_date"), "last_activity": c.get("last_activity")}
+        for c in recent[:INSIGHTS_SAMPLE_SIZE]
+    ]
+    prompt = f"""
+You are AIVA, an enterprise AI assistant. Analyse churn risk for the company.
+
+Total Customers: {analytics['total_customers']}
+Customers by plan: {json.dumps(analytics['customers_by_plan'])}
+Inactive Customers: {len(inactive)}
+Inactive by plan: {json.dumps(dict(by_plan.most_common()))}
+Inactive by last activity month: {json.dumps(dict(sorted(by_last_activity.items())))}
+Inactive by join year: {json.dumps(dict(sorted(by_joined.items())))}
+
+Most recently active inactive customers ({len(sample)} of {len(inactive)}):
+{json.dumps(sample, indent=2)}
+
+Instructions:
+- Identify patterns among inactive customers (plan, join date, last activity)
+- Estimate the churn risk and name the most affected segment
+- Suggest two concrete retention actions
+- Keep it under 120 words, plain text, no headings
+"""
+    return generate_text(INSIGHTS_MODEL, prompt, max_output_tokens=512).text
+
+def feedback_themes_insight():
+    feedback = store.rows("feedback")
+    by_category = Counter(f.get("category") for f in feedback)
+    by_rating = Counter(f.get("rating") for f in feedback)
+    by_status = Counter(f.get("status") for f in feedback)
+    # Newest first, then the lowest ratings and unresolved entries to the front
+    worst = sorted(reversed(feedback), key=lambda f: (f.get("rating") or 0, f.get("status") != "Pending"))
+    sample = [
+        {"rating": f.get("rating"), "category": f.get("category"), "status": f.get("status"),
+         "comment": str(f.get("comment") or "")[:300]}
+        for f in worst[:INSIGHTS_SAMPLE_SIZE]
+    ]
+    prompt = f"""
+You are AIVA, an enterprise AI assistant. Summarise customer feedback themes.
+
+Feedback entries: {len(feedback)}
+By category: {json.dumps(dict(by_category.most_common()), ensure_ascii=False)}
+By rating: {json.dumps({str(k): v for k, v in sorted(by_rating.items(), key=lambda kv: str(kv[0]))})}
+By status: {json.dumps(dict(by_status.most_common()), ensure_ascii=False)}
+
+Lowest-rated recent entries ({len(sample)} of {len(feedback)}):
+{json.dumps(sample, indent=2, ensure_ascii=False)}
+
+Instructions:
+- List the three most important themes with how often they occur
+- Point out the most urgent unresolved issue
+- Keep it under 120 words, plain text, no headings
+"""
+    return generate_text(INSIGHTS_MODEL, prompt, max_output_tokens=512).text
+
+INSIGHTS = {
+    "churn": churn_insight,
+    "feedback_themes": feedback_themes_insight,
+}
+
+# Last generation per insight kind: (data version, time.monotonic() when queued)
+insight_generations = {}
+
+def refresh_insight(kind, retry=False):
+    """
+    Return the newest job for an insight, first queueing a new one if the data
+    changed since it was generated and the last one is at least
+    INSIGHTS_MIN_INTERVAL old, so a stream of writes can't queue an LLM call each.
+    A failed job is retried after INSIGHTS_RETRY_SECONDS, or at once with `retry`.
+    """
+    version = data_version()
+    last = insight_generations.get(kind)
+    if last is not None:
+        last_version, queued_at = last
+        job = job_queue.lookup(("insight", kind, last_version, INSIGHTS_MODEL))
+        age = time.monotonic() - queued_at
+        if job is not None and job.status == "failed":
+            if not retry and age < INSIGHTS_RETRY_SECONDS:
+                return job
+        elif job is not None and (age < INSIGHTS_MIN_INTERVAL or last_version == version):
+            return job
+    insight_generations[kind] = (version, time.monotonic())
+    return job_queue.submit(
+        f"insight:{kind}", INSIGHTS[kind], key=("insight", kind, version, INSIGHTS_MODEL)
+    )
+
+async def watch_data():
+    """Keep the insights up to date with the data, within INSIGHTS_MIN_INTERVAL"""
+    while True:
+        if LLM_CONFIGURED:
+            for kind in INSIGHTS:
+                refresh_insight(kind)
+        await asyncio.sleep(INSIGHTS_POLL_SECONDS)
+
+@app.get("/insights", dependencies=[Depends(current_user)])
+async def get_insights():
+    """Get the latest precomputed AI insights; `snapshot` is the data version each was generated for"""
+    insights = {}
+    for kind in INSIGHTS:
+        job = refresh_insight(kind) if LLM_CONFIGURED else None
+        insights[kind] = (
+            {**job.to_dict(include_result=True), "snapshot": insight_generations[kind][0]} if job else None
+        )
+    return {"snapshot": data_version(), "insights": insights}
+
+@app.post("/insights/{kind}", status_code=202, dependencies=[Depends(current_user)])
+async def create_insight_job(kind: str):
+    """
+    Queue generation of an AI insight for the current data and return its job ID.
+    Within INSIGHTS_MIN_INTERVAL of the last generation the existing job is
+    returned, unless it failed.
+    """
+    if kind not in INSIGHTS:
+        raise HTTPException(status_code=404, detail=f"Unknown insight: {kind}")
+    if not LLM_CONFIGURED:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
+    return refresh_insight(kind, retry=True).to_dict()
+
+def get_job_or_404(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}", dependencies=[Depends(current_user)])
+async def get_job(job_id: str):
+    """Get the status of a background job"""
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/result", dependencies=[Depends(current_user)])
+async def get_job_result(job_id: str, wait: float = 0):
+    """Get the result of a background job, optionally waiting up to `wait` seconds"""
+    job = get_job_or_404(job_id)
+    if wait > 0 and not job.finished:
+        await job_queue.wait(job, timeout=min(wait, 60))
+    return job.to_dict(include_result=True)
+
+@app.get("/jobs/{job_id}/events", dependencies=[Depends(current_user)])
+async def stream_job_events(job_id: str):
+    """Stream job status changes as server-sent events until the job finishes"""
+    job = get_job_or_404(job_id)
+
+    async def events():
+        last_status = None
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                payload = job.to_dict(include_result=job.finished)
+                yield f"event: {job.status}\ndata: {json.dumps(payload)}\n\n"
+            if job.finished:
+                return
+            await job_queue.wait(job, timeout=1)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/admin/usage", dependencies=[Depends(require_admin)])
+def get_usage():
+    """LLM requests and token usage per user and model"""
+    return {"limits": LLM_RATE_LIMITS, "usage": usage_meter.snapshot()}
+
 @app.get("/health")
 def health_check():
     return {
         "status": "healthy",
-        "gemini_api": "configured" if GEMINI_API_KEY else "not configured"
+        "gemini_api": "configured" if GEMINI_API_KEY else "not configured",
+        "llm": llm_client.status(),
+        "jobs": job_queue.stats(),
+        "indexes": {
+            index.name: "ready" if index.get() else f"failed: {index.error}" if index.error else "building"
+            for index in (chart_series, feedback_index)
+        },
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average with bursts of up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume one token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets per (user, model), sized by the user's role.
+
+    ``limits`` maps role -> model -> (requests per minute, burst). The model
+    ``"*"`` is the default for models without their own entry and roles
+    without an entry fall back to ``default_role``.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, Tuple[float, float]]], default_role: str = "user"):
+        self.limits = limits
+        self.default_role = default_role
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, role: str, model: str) -> Tuple[float, float]:
+        role_limits = self.limits.get(role) or self.limits[self.default_role]
+        return role_limits.get(model) or role_limits["*"]
+
+    def acquire(self, user: str, role: str, model: str) -> float:
+        """Returns 0 if the call may proceed, else the seconds to wait before retrying"""
+        with self._lock:
+            bucket = self._buckets.get((user, model))
+            if bucket is None:
+                per_minute, burst = self.limit_for(role, model)
+                bucket = TokenBucket(per_minute / 60, burst)
+                self._buckets[(user, model)] = bucket
+            return bucket.take()
+
+
+class UsageMeter:
+    """Counts LLM requests and tokens per user and model"""
+
+    def __init__(self):
+        self._usage = defaultdict(lambda: defaultdict(lambda: {
+            "requests": 0, "errors": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+        }))
+        self._lock = threading.Lock()
+
+    def record(self, user: str, model: str, prompt_tokens: int = 0, output_tokens: int = 0, error: bool = False):
+        with self._lock:
+            usage = self._usage[user][model]
+            usage["requests"] += 1
+            usage["errors"] += int(error)
+            usage["prompt_tokens"] += prompt_tokens
+            usage["output_tokens"] += output_tokens
+            usage["total_tokens"] += prompt_tokens + output_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            report = {}
+            for user, models in self._usage.items():
+                totals = {"requests": 0, "errors": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+                for usage in models.values():
+                    for key in totals:
+                        totals[key] += usage[key]
+                report[user] = {"total": totals, "models": {m: dict(u) for m, u in models.items()}}
+            return report
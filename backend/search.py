@@ -0,0 +1,408 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, List, Optional
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+QUERY_RE = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+ID_STOPWORDS = {
+    "yang", "dan", "di", "ke", "dari", "untuk", "dengan", "ini", "itu", "ada", "tidak",
+    "agak", "sangat", "sudah", "belum", "juga", "atau", "pada", "saya", "kami", "kita",
+    "akan", "bisa", "lebih", "karena", "tapi", "tetapi", "jadi", "dalam", "oleh", "sekali",
+    "masih", "lagi", "harus", "banyak", "sering", "terlalu", "kurang", "perlu", "mohon",
+}
+EN_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are", "was",
+    "were", "be", "it", "this", "that", "very", "too", "not", "but", "so", "my", "we", "i",
+    "you", "your", "our", "at", "as", "by", "from", "have", "has", "had", "can", "could",
+}
+
+ID_PARTICLES = ("lah", "kah", "tah", "pun")
+ID_POSSESSIVES = ("nya", "ku", "mu")
+ID_SUFFIXES = ("kan", "an", "i")
+# Prefix -> replacement letter when the stem starts with a vowel (menulis -> tulis)
+ID_PREFIXES = (
+    ("meny", "s"), ("peny", "s"), ("meng", ""), ("peng", ""), ("mem", "p"), ("pem", "p"),
+    ("men", "t"), ("pen", "t"), ("ber", ""), ("ter", ""), ("per", ""), ("me", ""), ("pe", ""),
+    ("be", ""), ("di", ""), ("ke", ""), ("se", ""),
+)
+# Two-letter prefixes that also start many roots (sedang, kecil, better)
+# only come off when a longer stem remains
+ID_WEAK_PREFIXES = {"me", "pe", "be", "ke", "se"}
+# Consonant pairs that can open an Indonesian root; any other pair means
+# the prefix was part of the word (service, better)
+ID_ONSETS = {
+    "ng", "ny", "kh", "sy", "tr", "pr", "kr", "gr", "br", "dr",
+    "bl", "kl", "pl", "fl", "gl", "sl", "st", "sk", "sp", "sw", "kw",
+}
+VOWELS = set("aeiou")
+MIN_STEM = 4
+
+
+def _strip_suffix(word: str, suffixes) -> str:
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def _strip_prefix(word: str) -> Optional[str]:
+    """The word without its prefix, or None if no prefix leaves a plausible root"""
+    for prefix, recode in ID_PREFIXES:
+        if not word.startswith(prefix):
+            continue
+        rest = word[len(prefix):]
+        if recode and rest[:1] in VOWELS:
+            rest = recode + rest
+        elif recode and prefix in ("meny", "peny"):
+            continue
+        if len(rest) < MIN_STEM + (prefix in ID_WEAK_PREFIXES):
+            continue
+        if rest[0] in VOWELS or rest[1] in VOWELS or rest[:2] in ID_ONSETS:
+            return rest
+    return None
+
+
+def stem_id(word: str) -> str:
+    """Light Indonesian stemmer: particle, then one prefix, then possessive and derivational suffix"""
+    word = _strip_suffix(word, ID_PARTICLES)
+    # Prefix first, so suffixes only come off if a full root is left without
+    # the prefix too (bertanya -> tanya, not berta -> rta)
+    stem = _strip_prefix(word) or word
+    for group in (ID_POSSESSIVES, ID_SUFFIXES):
+        stem = _strip_suffix(stem, group)
+    return stem
+
+
+def stem_en(word: str) -> str:
+    """Light English stemmer covering plurals and the common verb and adverb endings"""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    for suffix in ("ingly", "edly", "ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+class FeedbackIndex:
+    """
+    In-memory inverted index over feedback ``comment``, ``category`` and ``user``,
+    ranked with BM25.
+
+    Comments mix Indonesian and English, so each comment word is indexed
+    under both its Indonesian and its English stem, and query terms are
+    looked up under both. A trailing ``*`` makes a term a prefix query, matched against
+    the sorted vocabulary of unstemmed words. The index follows the store's
+    write hook, so inserts and edits are reflected immediately.
+
+    Top-k retrieval uses the threshold algorithm over impact-ordered
+    postings: each query word yields its documents best first, every new
+    document is scored in full by direct lookup, and the walk stops as soon
+    as the k-th best score reaches the sum of what the words could still
+    add. A common word therefore costs about ``limit`` postings instead of
+    all of them.
+
+    Impact order: for a given term frequency a BM25 score only falls with
+    document length, so each term keeps one list of ``(doc_len, doc_id)``
+    per frequency, sorted lazily after writes, and the lists are merged by
+    score at query time. Entries of removed or edited documents are skipped
+    when read and dropped once they outnumber the live ones.
+    """
+
+    FIELD_WEIGHTS = {"comment": 1, "category": 2, "user": 2}
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_EXPANSION = 50
+    # New vocabulary words are scanned unsorted until they reach this share
+    # of the sorted list, then merged into it
+    NEW_WORDS_RATIO = 8
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._impacts: Dict[str, Dict[int, list]] = defaultdict(dict)
+        self._unsorted: set = set()
+        self._stale: Counter = Counter()
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_words: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        # Unstemmed words for prefix lookups, with their stems. `_words` is
+        # sorted and may still hold words no longer indexed; words added
+        # since it was last rebuilt are in `_new_words`.
+        self._words: List[str] = []
+        self._listed: set = set()
+        self._new_words: set = set()
+        self._word_refs: Counter = Counter()
+        self._word_stems: Dict[str, set] = defaultdict(set)
+        store.subscribe(self._on_write, replay=True)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, filters: Optional[dict] = None) -> dict:
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        wanted = offset + limit
+        with self._lock:
+            clauses = [self._expand(word.lower(), bool(star)) for word, star in QUERY_RE.findall(query)]
+            clauses = [[term for term in terms if term in self._postings] for terms in clauses]
+            clauses = [terms for terms in clauses if terms]
+            if not clauses:
+                return {"query": query, "total": 0, "results": []}
+
+            n_docs = len(self._doc_len) or 1
+            avg_len = self._total_len / n_docs if self._total_len else 1
+            # BM25 denominator is tf + c1 + c2 * doc_len
+            c1 = self.K1 * (1 - self.B)
+            c2 = self.K1 * self.B / avg_len
+            weights = {
+                term: (self.K1 + 1) * self._idf(len(self._postings[term]), n_docs)
+                for terms in clauses for term in terms
+            }
+
+            top = self._threshold_top(clauses, weights, c1, c2, wanted, filters)
+            if top is None:
+                top = self._exhaustive_top(clauses, weights, c1, c2, wanted, filters)
+
+            if len(clauses) == 1 and len(clauses[0]) == 1:
+                matched = self._postings[clauses[0][0]].keys()
+            else:
+                matched = set().union(*(self._postings[term].keys() for terms in clauses for term in terms))
+            if filters:
+                total = sum(1 for doc_id in matched if self._matches(doc_id, filters))
+            else:
+                total = len(matched)
+
+        ranked = sorted(((score, -neg_id) for score, neg_id in top), key=lambda item: (-item[0], item[1]))
+        results = []
+        for score, doc_id in ranked[offset:]:
+            record = self._store.get("feedback", doc_id)
+            if record is not None:
+                results.append({"score": round(score, 4), **record})
+        return {"query": query, "total": total, "results": results}
+
+    @staticmethod
+    def _idf(df: int, n_docs: int) -> float:
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def _threshold_top(self, clauses, weights, c1, c2, wanted, filters) -> Optional[list]:
+        """
+        Best ``wanted`` documents as a min-heap of ``(score, -doc_id)``, or None
+        when the walk would cover most postings anyway (several common words)
+        and scoring them all at once is cheaper.
+        """
+        # Scoring a document by lookup costs about one posting per query
+        # term; past this budget scoring every posting directly is cheaper
+        n_terms = sum(len(terms) for terms in clauses)
+        budget = sum(len(self._postings[term]) for terms in clauses for term in terms) // n_terms
+        lookups = [[(self._postings[term], weights[term]) for term in terms] for terms in clauses]
+        doc_len = self._doc_len
+        streams = [self._ranked(terms, weights, c1, c2) for terms in clauses]
+        frontier = [0.0] * len(streams)
+        top = []
+        seen = set()
+        while any(streams):
+            for i, stream in enumerate(streams):
+                if stream is None:
+                    continue
+                item = next(stream, None)
+                if item is None:
+                    streams[i] = None
+                    frontier[i] = 0.0
+                    continue
+                frontier[i], doc_id = item
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                if filters and not self._matches(doc_id, filters):
+                    continue
+                score = item[0]
+                if len(clauses) > 1:
+                    score = 0.0
+                    denominator = c1 + c2 * doc_len[doc_id]
+                    for clause in lookups:
+                        # A word matching under several stems or prefixes counts once
+                        best = 0.0
+                        for postings, weight in clause:
+                            tf = postings.get(doc_id)
+                            if tf and weight * tf / (tf + denominator) > best:
+                                best = weight * tf / (tf + denominator)
+                        score += best
+                if len(top) < wanted:
+                    heapq.heappush(top, (score, -doc_id))
+                elif (score, -doc_id) > top[0]:
+                    heapq.heapreplace(top, (score, -doc_id))
+            # No document not yet seen can score above sum(frontier)
+            if len(top) >= wanted and top[0][0] >= sum(frontier):
+                break
+            if len(clauses) > 1 and len(seen) > budget:
+                return None
+        return top
+
+    def _exhaustive_top(self, clauses, weights, c1, c2, wanted, filters) -> list:
+        """Score every matching document, term at a time; same result as ``_threshold_top``"""
+        scores: Dict[int, float] = defaultdict(float)
+        doc_len = self._doc_len
+        for terms in clauses:
+            if len(terms) == 1:
+                # Common case: the word has a single indexed form
+                weight = weights[terms[0]]
+                for doc_id, tf in self._postings[terms[0]].items():
+                    scores[doc_id] += weight * tf / (tf + c1 + c2 * doc_len[doc_id])
+                continue
+            clause_scores: Dict[int, float] = {}
+            for term in terms:
+                weight = weights[term]
+                for doc_id, tf in self._postings[term].items():
+                    score = weight * tf / (tf + c1 + c2 * doc_len[doc_id])
+                    if score > clause_scores.get(doc_id, 0):
+                        clause_scores[doc_id] = score
+            for doc_id, score in clause_scores.items():
+                scores[doc_id] += score
+        candidates = (
+            (score, -doc_id) for doc_id, score in scores.items()
+            if not filters or self._matches(doc_id, filters)
+        )
+        return heapq.nlargest(wanted, candidates)
+
+    def _matches(self, doc_id: int, filters: dict) -> bool:
+        record = self._store.get("feedback", doc_id)
+        return record is not None and all(record.get(k) == v for k, v in filters.items())
+
+    def _ranked(self, terms: List[str], weights: Dict[str, float], c1: float, c2: float):
+        """``(score, doc_id)`` of the documents matching any of ``terms``, best first, each once"""
+        groups = []
+        for term in terms:
+            for tf, entries in self._impact_lists(term).items():
+                groups.append(self._scored(term, tf, entries, weights[term], c1, c2))
+        seen = set()
+        for score, doc_id in heapq.merge(*groups, key=itemgetter(0), reverse=True):
+            if doc_id not in seen:
+                seen.add(doc_id)
+                yield score, doc_id
+
+    def _scored(self, term: str, tf: int, entries: list, weight: float, c1: float, c2: float):
+        postings = self._postings[term]
+        doc_len = self._doc_len
+        for length, doc_id in entries:
+            # Skip entries left behind by removed or edited documents
+            if postings.get(doc_id) == tf and doc_len.get(doc_id) == length:
+                yield weight * tf / (tf + c1 + c2 * length), doc_id
+
+    def _impact_lists(self, term: str) -> Dict[int, list]:
+        impacts = self._impacts[term]
+        if self._stale[term] > len(self._postings[term]):
+            impacts.clear()
+            for doc_id, tf in self._postings[term].items():
+                impacts.setdefault(tf, []).append((self._doc_len[doc_id], doc_id))
+            del self._stale[term]
+            self._unsorted.add(term)
+        if term in self._unsorted:
+            # Mostly sorted already, with a few new entries at the end
+            for entries in impacts.values():
+                entries.sort()
+            self._unsorted.discard(term)
+        return impacts
+
+    def _expand(self, word: str, prefix: bool) -> set:
+        if not prefix:
+            return {word, stem_id(word), stem_en(word)}
+        matches = [candidate for candidate in self._new_words if candidate.startswith(word)]
+        listed = 0
+        for candidate in islice(self._words, bisect_left(self._words, word), None):
+            if not candidate.startswith(word) or listed >= self.MAX_PREFIX_EXPANSION:
+                break
+            if candidate in self._word_refs:
+                matches.append(candidate)
+                listed += 1
+        terms = set()
+        for candidate in sorted(matches)[:self.MAX_PREFIX_EXPANSION]:
+            terms |= self._word_stems[candidate]
+        return terms
+
+    def _analyze(self, record: dict):
+        """Weighted term frequencies and the unstemmed words (with their stems) of a record"""
+        terms = Counter()
+        words = Counter()
+        stems: Dict[str, set] = defaultdict(set)
+        length = 0
+        for field, weight in self.FIELD_WEIGHTS.items():
+            tokens = TOKEN_RE.findall(str(record.get(field) or "").lower())
+            if field == "comment":
+                stemmers, stopwords = (stem_id, stem_en), ID_STOPWORDS | EN_STOPWORDS
+            elif field == "category":
+                stemmers, stopwords = (stem_en,), EN_STOPWORDS
+            else:
+                stemmers, stopwords = (lambda token: token,), set()
+            for token in tokens:
+                if token in stopwords:
+                    continue
+                for term in {stem(token) for stem in stemmers}:
+                    terms[term] += weight
+                    stems[token].add(term)
+                words[token] += 1
+                length += 1
+        return terms, words, stems, length
+
+    def _on_write(self, table: str, old: Optional[dict], new: dict):
+        if table != "feedback":
+            return
+        with self._lock:
+            if old is not None:
+                self._remove(old["id"])
+            self._add(new)
+
+    def _add(self, record: dict):
+        doc_id = record["id"]
+        terms, words, stems, length = self._analyze(record)
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+            self._impacts[term].setdefault(tf, []).append((length, doc_id))
+            self._unsorted.add(term)
+        for word in words:
+            if self._word_refs[word] == 0 and word not in self._listed:
+                self._new_words.add(word)
+            self._word_refs[word] += 1
+            self._word_stems[word] |= stems[word]
+        if len(self._new_words) > max(1024, len(self._words) // self.NEW_WORDS_RATIO):
+            self._rebuild_words()
+        self._doc_terms[doc_id] = terms
+        self._doc_words[doc_id] = words
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def _remove(self, doc_id: int):
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if postings:
+                self._stale[term] += 1
+                continue
+            del self._postings[term]
+            self._impacts.pop(term, None)
+            self._stale.pop(term, None)
+            self._unsorted.discard(term)
+        for word in self._doc_words.pop(doc_id, ()):
+            self._word_refs[word] -= 1
+            if self._word_refs[word] <= 0:
+                del self._word_refs[word]
+                del self._word_stems[word]
+                self._new_words.discard(word)
+        if len(self._listed) > 2 * len(self._word_refs) + 1024:
+            self._rebuild_words()
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+
+    def _rebuild_words(self):
+        self._words = sorted(self._word_refs)
+        self._listed = set(self._words)
+        self._new_words = set()
@@ -0,0 +1,155 @@
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from typing import Optional
+
+GRANULARITIES = ("day", "week", "month")
+# Dates outside this range are taken for typos and left out of the series
+MIN_DATE = date(1970, 1, 1)
+MAX_DATE = date(2100, 12, 31)
+# Longest axis laid out, counted back from the latest date
+MAX_AXIS_DAYS = 20 * 366
+# Series kept per store version; ``points`` is client-chosen, so the cache is an LRU
+CACHE_SIZE = 16
+
+
+def _parse_date(value) -> Optional[date]:
+    try:
+        day = date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+    return day if MIN_DATE <= day <= MAX_DATE else None
+
+
+def _bucket(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket: date, granularity: str) -> date:
+    if granularity == "week":
+        return bucket + timedelta(days=7)
+    if granularity == "month":
+        return (bucket + timedelta(days=32)).replace(day=1)
+    return bucket + timedelta(days=1)
+
+
+def _label(bucket: date, granularity: str) -> str:
+    return bucket.strftime("%Y-%m") if granularity == "month" else bucket.isoformat()
+
+
+class ChartSeries:
+    """
+    Ready-to-plot histograms and time series for the Dashboard.
+
+    Counts are kept per field value and per calendar day, updated from the
+    store's write hook, so building a chart costs O(number of days) instead
+    of O(number of rows). Week and month series are rolled up from the daily
+    counts on request and the last few are cached until the next write.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._histograms = {
+            "customer_status": Counter(),
+            "customer_plan": Counter(),
+            "feedback_rating": Counter(),
+            "feedback_category": Counter(),
+        }
+        # Daily counters; avg rating is rating_sum / feedback
+        self._daily = {
+            "signups": Counter(),
+            "last_active": Counter(),
+            "feedback": Counter(),
+            "rating_sum": Counter(),
+        }
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._cache_version = None
+        store.subscribe(self._on_write, replay=True)
+
+    def histograms(self) -> dict:
+        with self._lock:
+            return {
+                name: {str(k): v for k, v in sorted(counts.items(), key=lambda kv: str(kv[0])) if v}
+                for name, counts in self._histograms.items()
+            }
+
+    def timeseries(self, granularity: str = "month", points: int = 200) -> dict:
+        """Columnar series ``{"t": [...], "signups": [...], ...}`` with at most ``points`` entries"""
+        version = self._store.version
+        key = (granularity, points)
+        with self._lock:
+            if self._cache_version != version:
+                self._cache.clear()
+                self._cache_version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self._cache[key] = result = self._build(granularity, points)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
+
+    def _build(self, granularity: str, points: int) -> dict:
+        rolled = {name: Counter() for name in self._daily}
+        for name, counts in self._daily.items():
+            for day, value in counts.items():
+                if value:
+                    rolled[name][_bucket(day, granularity)] += value
+
+        days = [day for counts in rolled.values() for day in counts]
+        if not days:
+            return {"granularity": granularity, "bucket_size": 1, "t": [], "signups": [],
+                    "last_active": [], "feedback": [], "avg_rating": []}
+
+        # Continuous axis so empty periods show up as zeros, capped so a few
+        # stray old dates can't stretch it over decades of empty buckets
+        buckets = []
+        last = max(days)
+        bucket = max(min(days), _bucket(last - timedelta(days=MAX_AXIS_DAYS), granularity))
+        while bucket <= last:
+            buckets.append(bucket)
+            bucket = _next_bucket(bucket, granularity)
+
+        # Downsample by merging runs of adjacent buckets into one point
+        size = max(1, -(-len(buckets) // max(points, 1)))
+        series = {"t": [], "signups": [], "last_active": [], "feedback": [], "avg_rating": []}
+        for start in range(0, len(buckets), size):
+            group = buckets[start:start + size]
+            totals = {name: sum(rolled[name][b] for b in group) for name in rolled}
+            series["t"].append(_label(group[0], granularity))
+            series["signups"].append(totals["signups"])
+            series["last_active"].append(totals["last_active"])
+            series["feedback"].append(totals["feedback"])
+            series["avg_rating"].append(
+                round(totals["rating_sum"] / totals["feedback"], 2) if totals["feedback"] else None
+            )
+        return {"granularity": granularity, "bucket_size": size, **series}
+
+    def _on_write(self, table: str, old: Optional[dict], new: dict):
+        with self._lock:
+            if old is not None:
+                self._account(table, old, -1)
+            self._account(table, new, 1)
+
+    def _account(self, table: str, record: dict, sign: int):
+        if table == "customers":
+            self._histograms["customer_status"][record.get("status")] += sign
+            self._histograms["customer_plan"][record.get("plan")] += sign
+            self._add_day("signups", record.get("joined_date"), sign)
+            self._add_day("last_active", record.get("last_activity"), sign)
+        else:
+            rating = record.get("rating")
+            self._histograms["feedback_rating"][rating] += sign
+            self._histograms["feedback_category"][record.get("category")] += sign
+            self._add_day("feedback", record.get("date"), sign)
+            self._add_day("rating_sum", record.get("date"), sign * (rating or 0))
+
+    def _add_day(self, name: str, value, amount: int):
+        day = _parse_date(value)
+        if day is not None:
+            self._daily[name][day] += amount
@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+from bisect import bisect_right, insort
+from collections import Counter, deque
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+TABLES = ("customers", "feedback")
+
+
+def _fsync_dir(path: str):
+    """Make renames and new files in ``path``'s directory survive a crash (POSIX only)"""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DataStore:
+    """
+    In-memory company data backed by a snapshot file and an append-only log.
+
+    ``data.json`` is the snapshot. Every write is first appended to the
+    write-ahead log (one JSON object per line, fsynced) and then applied to
+    the in-memory tables and aggregates, so readers never touch the files
+    and can never observe a half-written record. On startup the log is
+    replayed on top of the snapshot; a torn last line from a crash is
+    ignored. Once the log grows past ``compact_every`` entries it is folded
+    into a new snapshot in a background thread: the log is rotated to
+    ``<wal>.old`` under the lock, and the snapshot is serialised, written to
+    a temp file and atomically swapped in outside it, so writers only wait
+    for the in-memory copy. The old segment is deleted once the snapshot is
+    in place and replayed before the log if a crash left it behind.
+
+    Each log entry carries the full record after the write, so replaying an
+    entry twice is harmless.
+    """
+
+    def __init__(self, data_path: str, wal_path: Optional[str] = None, compact_every: int = 10000):
+        self.data_path = data_path
+        self.wal_path = wal_path or data_path + ".wal"
+        self.old_wal_path = self.wal_path + ".old"
+        self.compact_every = compact_every
+        self.version = 0
+        self._lock = threading.RLock()
+        self._tables = {name: {} for name in TABLES}
+        self._extra_analytics = {}
+        self._listeners: List[Callable] = []
+        self._wal_entries = 0
+        self._compact_lock = threading.Lock()
+        self._next_id = {name: 1 for name in TABLES}
+        # Record ids per table in ascending order, for scans in slices
+        self._ids = {name: [] for name in TABLES}
+        self._reset_aggregates()
+        self._load()
+
+    # Reads
+
+    def rows(self, table: str, filters: Optional[dict] = None, limit: Optional[int] = None) -> list:
+        """
+        Records of a table, optionally only those whose fields equal ``filters``.
+        With ``limit`` only the most recently added matches are returned, newest first.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        with self._lock:
+            records = self._tables[table].values()
+            if limit is not None:
+                records = reversed(records)
+            if filters:
+                records = (
+                    record for record in records
+                    if all(record.get(k) == v for k, v in filters.items())
+                )
+            if limit is not None:
+                records = islice(records, limit)
+            return list(records)
+
+    def scan(self, table: str, filters: Optional[dict] = None, batch: int = 1000) -> Iterator[dict]:
+        """
+        Records of a table in id order, like ``rows`` but read ``batch`` at a
+        time so memory stays flat and the lock is only held per slice.
+        Writes made during the scan may or may not be seen.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        last_id = None
+        while True:
+            with self._lock:
+                ids = self._ids[table]
+                start = 0 if last_id is None else bisect_right(ids, last_id)
+                records = [self._tables[table][record_id] for record_id in ids[start:start + batch]]
+            if not records:
+                return
+            last_id = records[-1]["id"]
+            for record in records:
+                if all(record.get(k) == v for k, v in filters.items()):
+                    yield record
+
+    def get(self, table: str, record_id: int) -> Optional[dict]:
+        return self._tables[table].get(record_id)
+
+    def analytics(self) -> dict:
+        with self._lock:
+            total_feedback = len(self._tables["feedback"])
+            analytics = dict(self._extra_analytics)
+            analytics.update({
+                "total_customers": len(self._tables["customers"]),
+                "active_customers": self._status["Active"],
+                "inactive_customers": len(self._tables["customers"]) - self._status["Active"],
+                "customers_by_plan": {k: v for k, v in self._plans.items() if v},
+                "total_feedback": total_feedback,
+                "average_rating": round(self._rating_sum / total_feedback, 2) if total_feedback else 0,
+                "feedback_by_category": {k: v for k, v in self._categories.items() if v},
+            })
+            return analytics
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "customers": self.rows("customers"),
+                "feedback": self.rows("feedback"),
+                "analytics": self.analytics(),
+            }
+
+    def subscribe(self, callback: Callable[[str, Optional[dict], dict], None], replay: bool = False):
+        """
+        Call ``callback(table, old_record, new_record)`` after every write.
+        With ``replay`` the callback first receives every existing record as
+        an insert. The replay runs outside the store lock, so writers are not
+        held up while a large index is built; writes made in the meantime are
+        queued and delivered after it, in order, so none is missed.
+        """
+        if not replay:
+            with self._lock:
+                self._listeners.append(callback)
+            return
+
+        pending = deque()
+        def queue(table, old, new):
+            pending.append((table, old, new))
+
+        with self._lock:
+            existing = [(table, list(rows.values())) for table, rows in self._tables.items()]
+            self._listeners.append(queue)
+        for table, records in existing:
+            for record in records:
+                callback(table, None, record)
+        # Catch up without the lock, then hand over under it once only the
+        # writes that raced with the catch-up are left
+        while pending:
+            callback(*pending.popleft())
+        with self._lock:
+            while pending:
+                callback(*pending.popleft())
+            self._listeners[self._listeners.index(queue)] = callback
+
+    # Writes
+
+    def insert(self, table: str, record: dict) -> dict:
+        return self.put_many(table, [record])[0]
+
+    def update(self, table: str, record_id: int, changes: dict) -> Optional[dict]:
+        with self._lock:
+            current = self._tables[table].get(record_id)
+            if current is None:
+                return None
+            return self.put_many(table, [{**current, **changes, "id": record_id}])[0]
+
+    def put_many(self, table: str, records: Iterable[dict]) -> List[dict]:
+        """Insert or replace records in one log append; records without an id get the next free one"""
+        if table not in self._tables:
+            raise KeyError(table)
+        with self._lock:
+            next_id = self._next_id[table]
+            written = []
+            for record in records:
+                record = dict(record)
+                if record.get("id") is None:
+                    record["id"] = next_id
+                next_id = max(next_id, record["id"] + 1)
+                written.append(record)
+            if not written:
+                return []
+
+            with open(self.wal_path, "a", encoding="utf-8") as f:
+                for record in written:
+                    f.write(json.dumps({"table": table, "record": record}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._wal_entries += len(written)
+
+            for record in written:
+                self._apply(table, record)
+            self.version += 1
+
+            if self._wal_entries >= self.compact_every and not self._compact_lock.locked():
+                threading.Thread(target=self.compact, name="compact", daemon=True).start()
+            return written
+
+    def compact(self):
+        """Fold the log into a fresh snapshot and start a new log; a no-op when the log is empty"""
+        with self._compact_lock:
+            with self._lock:
+                if not self._wal_entries:
+                    return
+                data = self.snapshot()
+                self._rotate_wal()
+            tmp_path = self.data_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.data_path)
+            _fsync_dir(self.data_path)
+            os.remove(self.old_wal_path)
+
+    # Internals
+
+    def _load(self):
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._extra_analytics = {
+            k: v for k, v in data.get("analytics", {}).items()
+            if k == "monthly_stats"
+        }
+        for table in TABLES:
+            for record in data.get(table, []):
+                self._apply(table, record)
+
+        # A leftover old segment means a compaction was interrupted; its
+        # entries are older than everything in the current log
+        for path in (self.old_wal_path, self.wal_path):
+            if os.path.exists(path):
+                self._replay(path)
+        if not os.path.exists(self.wal_path):
+            open(self.wal_path, "w").close()
+            _fsync_dir(self.wal_path)
+        self.version += 1
+
+    def _replay(self, path: str):
+        with open(path, "rb+") as f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise json.JSONDecodeError("unterminated entry", "", 0)
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write at the tail of the log; cut it off so
+                    # new entries are not appended after the garbage
+                    f.truncate(offset)
+                    break
+                self._apply(entry["table"], entry["record"])
+                self._wal_entries += 1
+                offset += len(line)
+
+    def _rotate_wal(self):
+        """Move the log aside as the old segment and start an empty one; caller holds the lock"""
+        if os.path.exists(self.old_wal_path) and os.path.exists(self.wal_path):
+            # Left over from an interrupted compaction: keep its entries
+            # and add the current log after them
+            with open(self.wal_path, "rb") as src, open(self.old_wal_path, "ab") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.wal_path)
+        elif os.path.exists(self.wal_path):
+            os.replace(self.wal_path, self.old_wal_path)
+        # Create the new log now, so its directory entry is durable before
+        # anything is appended to it
+        open(self.wal_path, "w").close()
+        _fsync_dir(self.wal_path)
+        self._wal_entries = 0
+
+    def _reset_aggregates(self):
+        self._status = Counter()
+        self._plans = Counter()
+        self._categories = Counter()
+        self._rating_sum = 0
+
+    def _account(self, table: str, record: dict, sign: int):
+        if table == "customers":
+            self._status[record.get("status")] += sign
+            self._plans[record.get("plan")] += sign
+        else:
+            self._categories[record.get("category")] += sign
+            self._rating_sum += sign * record.get("rating", 0)
+
+    def _apply(self, table: str, record: dict):
+        rows = self._tables[table]
+        old = rows.get(record["id"])
+        if old is not None:
+            self._account(table, old, -1)
+        rows[record["id"]] = record
+        if old is None:
+            ids = self._ids[table]
+            if not ids or record["id"] > ids[-1]:
+                ids.append(record["id"])
+            else:
+                insort(ids, record["id"])
+        self._account(table, record, 1)
+        self._next_id[table] = max(self._next_id[table], record["id"] + 1)
+        for callback in self._listeners:
+            callback(table, old, record)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other as top-level modules (`from store import ...`)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
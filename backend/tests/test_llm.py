@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from llm import FakeProvider, LLMError, ResilientLLM
+
+
+class FlakyProvider(FakeProvider):
+    """Fails the first ``failures`` calls with a transient error, then answers"""
+
+    def __init__(self, failures):
+        super().__init__(latency=0)
+        self.failures = failures
+        self.calls = []
+
+    def generate(self, model, prompt, config, timeout):
+        self.calls.append(model)
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("reset by peer")
+        return super().generate(model, prompt, config, timeout)
+
+
+class RejectingProvider(FakeProvider):
+    """Rejects requests to ``models`` (default: all) the way google.api_core errors do"""
+
+    class Rejected(Exception):
+        def __init__(self, code):
+            super().__init__(f"HTTP {code}")
+            self.code = code
+
+    def __init__(self, code=400, models=None):
+        super().__init__(latency=0)
+        self.code = code
+        self.models = models
+        self.calls = []
+
+    def generate(self, model, prompt, config, timeout):
+        self.calls.append(model)
+        if self.models is None or model in self.models:
+            raise self.Rejected(self.code)
+        return super().generate(model, prompt, config, timeout)
+
+
+def client(provider, **kwargs):
+    kwargs.setdefault("base_delay", 0)
+    return ResilientLLM(provider, **kwargs)
+
+
+def test_retries_transient_errors():
+    provider = FlakyProvider(failures=2)
+    result = client(provider, max_retries=2).generate("gemini-1.5-flash", "hello", {})
+    assert result.model == "gemini-1.5-flash"
+    assert result.attempts == 3
+    assert provider.calls == ["gemini-1.5-flash"] * 3
+
+
+def test_falls_back_when_retries_are_exhausted():
+    llm = client(
+        FakeProvider(latency=0, failing_models={"primary"}),
+        fallbacks={"primary": ["backup"]},
+        max_retries=1,
+    )
+    result = llm.generate("primary", "hello", {})
+    assert result.model == "backup"
+    assert result.attempts == 3
+
+
+def test_all_models_failing_is_a_502():
+    llm = client(FakeProvider(latency=0, failing_models={"primary", "backup"}), fallbacks={"primary": ["backup"]})
+    with pytest.raises(LLMError) as error:
+        llm.generate("primary", "hello", {})
+    assert error.value.status_code == 502
+
+
+def test_non_transient_error_stops_immediately():
+    provider = RejectingProvider(code=400)
+    llm = client(provider, fallbacks={"primary": ["backup"]}, max_retries=2)
+    with pytest.raises(LLMError) as error:
+        llm.generate("primary", "hello", {})
+    assert error.value.status_code == 400
+    assert provider.calls == ["primary"]
+    assert llm.status()["primary"]["circuit"] == "closed"
+
+
+def test_provider_auth_failure_is_a_502():
+    provider = RejectingProvider(code=401)
+    with pytest.raises(LLMError) as error:
+        client(provider, fallbacks={"primary": ["backup"]}).generate("primary", "hello", {})
+    assert error.value.status_code == 502
+    assert provider.calls == ["primary"]
+
+
+@pytest.mark.parametrize("code", [403, 404])
+def test_rejected_model_falls_back_without_retrying(code):
+    provider = RejectingProvider(code=code, models={"primary"})
+    llm = client(provider, fallbacks={"primary": ["backup"]}, max_retries=2)
+    result = llm.generate("primary", "hello", {})
+    assert result.model == "backup"
+    assert provider.calls == ["primary", "backup"]
+    assert llm.status()["primary"]["circuit"] == "closed"
+
+
+@pytest.mark.parametrize("code", [403, 404])
+def test_every_model_rejected_is_a_502(code):
+    provider = RejectingProvider(code=code)
+    with pytest.raises(LLMError) as error:
+        client(provider, fallbacks={"primary": ["backup"]}).generate("primary", "hello", {})
+    assert error.value.status_code == 502
+    assert provider.calls == ["primary", "backup"]
+
+
+def test_circuit_opens_and_skips_the_model():
+    provider = FakeProvider(latency=0, failing_models={"primary"})
+    llm = client(provider, fallbacks={"primary": ["backup"]}, max_retries=0, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        assert llm.generate("primary", "hello", {}).model == "backup"
+    assert llm.status()["primary"]["circuit"] == "open"
+
+    # The open circuit skips the primary entirely
+    result = llm.generate("primary", "hello", {})
+    assert result.model == "backup"
+    assert result.attempts == 1
+
+
+def test_open_circuit_without_fallback_is_a_503():
+    llm = client(FakeProvider(latency=0, failing_models={"primary"}), max_retries=0, failure_threshold=1)
+    with pytest.raises(LLMError):
+        llm.generate("primary", "hello", {})
+    with pytest.raises(LLMError) as error:
+        llm.generate("primary", "hello", {})
+    assert error.value.status_code == 503
+
+
+def test_circuit_half_opens_after_reset_timeout():
+    provider = FlakyProvider(failures=1)
+    llm = client(provider, max_retries=0, failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(LLMError):
+        llm.generate("primary", "hello", {})
+    assert llm.status()["primary"]["circuit"] == "open"
+    time.sleep(0.06)
+    assert llm.generate("primary", "hello", {}).model == "primary"
+    assert llm.status()["primary"]["circuit"] == "closed"
+
+
+def test_deadline_bounds_the_whole_call():
+    llm = client(FakeProvider(latency=1), fallbacks={"primary": ["backup"]}, deadline=0.2)
+    started = time.monotonic()
+    with pytest.raises(LLMError) as error:
+        llm.generate("primary", "hello", {})
+    assert error.value.status_code == 504
+    assert time.monotonic() - started < 0.5
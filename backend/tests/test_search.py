@@ -0,0 +1,111 @@
+import json
+import random
+
+import pytest
+
+from search import FeedbackIndex, stem_id
+from store import DataStore
+
+WORDS = "layanan lambat harga mahal aplikasi error bagus cepat service slow price app crash".split()
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = random.Random(7)
+    feedback = [
+        {
+            "id": i,
+            "user": f"user{i % 50}",
+            "email": "user@example.com",
+            "rating": rng.randint(1, 5),
+            "comment": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))),
+            "category": rng.choice(["Service", "Pricing", "App"]),
+            "date": "2025-10-01",
+            "status": rng.choice(["Pending", "Resolved"]),
+        }
+        for i in range(1, 2001)
+    ]
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"customers": [], "feedback": feedback, "analytics": {}}))
+    return DataStore(str(path))
+
+
+def exhaustive(index, query, limit, offset=0, filters=None):
+    """Reference ranking: every matching document scored, then sorted"""
+    index._threshold_top = lambda *args: None
+    try:
+        return index.search(query, limit=limit, offset=offset, filters=filters)
+    finally:
+        del index._threshold_top
+
+
+def ranking(result):
+    return [(round(r["score"], 4), r["id"]) for r in result["results"]]
+
+
+@pytest.mark.parametrize("query", ["layanan", "lambat harga", "app crash service", "lam* har*", "user7", "nothing"])
+@pytest.mark.parametrize("limit, offset, filters", [(20, 0, None), (5, 10, None), (20, 0, {"status": "Pending"})])
+def test_pruned_search_matches_exhaustive_ranking(store, query, limit, offset, filters):
+    index = FeedbackIndex(store)
+    expected = exhaustive(index, query, limit, offset, filters)
+    result = index.search(query, limit=limit, offset=offset, filters=filters)
+    assert result["total"] == expected["total"]
+    assert [score for score, _ in ranking(result)] == [score for score, _ in ranking(expected)]
+
+
+@pytest.mark.parametrize("word, stem", [
+    ("bertanya", "tanya"), ("menulisnya", "tulis"), ("pembayaran", "bayar"), ("dibeli", "beli"),
+    ("kecepatan", "cepat"), ("sedang", "sedang"), ("kecil", "kecil"), ("pencil", "pencil"),
+    ("service", "service"), ("better", "better"),
+])
+def test_indonesian_stemmer(word, stem):
+    assert stem_id(word) == stem
+
+
+@pytest.mark.parametrize("comment, query", [
+    ("Gagal upload files, sering error", "file"),
+    ("Gagal upload files, sering error", "files"),
+    ("Saya ingin bertanya tentang paket", "tanya"),
+    ("The app is slow when paying", "pay"),
+    ("Pembayaran sedang diproses", "bayar"),
+])
+def test_mixed_language_recall(tmp_path, comment, query):
+    path = tmp_path / "data.json"
+    feedback = {
+        "id": 1, "user": "zed", "email": "z@example.com", "rating": 2, "comment": comment,
+        "category": "Other", "date": "2025-10-01", "status": "Pending",
+    }
+    path.write_text(json.dumps({"customers": [], "feedback": [feedback], "analytics": {}}))
+    assert FeedbackIndex(DataStore(str(path))).search(query)["total"] == 1
+
+
+def test_index_follows_writes(store):
+    index = FeedbackIndex(store)
+    record = store.insert("feedback", {
+        "user": "zed", "email": "z@example.com", "rating": 1, "comment": "pengembalian dana lambat",
+        "category": "Billing", "date": "2025-10-02", "status": "Pending",
+    })
+    assert [r["id"] for r in index.search("pengembalian")["results"]] == [record["id"]]
+    assert index.search("pengemb*")["total"] == 1
+
+    store.update("feedback", record["id"], {"comment": "sudah beres"})
+    assert index.search("pengembalian")["total"] == 0
+    assert index.search("pengemb*")["total"] == 0
+    assert [r["id"] for r in index.search("beres")["results"]] == [record["id"]]
+
+
+def test_writes_during_build_are_not_lost(store):
+    class WritingIndex(FeedbackIndex):
+        written = None
+
+        def _on_write(self, table, old, new):
+            # The first replayed record triggers a write, as a concurrent writer would
+            if self.written is None:
+                self.written = store.insert("feedback", {
+                    "user": "zed", "email": "z@example.com", "rating": 2, "comment": "tagihan ganda",
+                    "category": "Billing", "date": "2025-10-03", "status": "Pending",
+                })
+            super()._on_write(table, old, new)
+
+    index = WritingIndex(store)
+    assert [r["id"] for r in index.search("tagihan")["results"]] == [index.written["id"]]
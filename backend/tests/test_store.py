@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+import pytest
+
+from store import DataStore
+
+CUSTOMER = {"name": "Budi", "email": "budi@example.com", "status": "Active", "plan": "Basic"}
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({
+        "customers": [{**CUSTOMER, "id": 1}],
+        "feedback": [],
+        "analytics": {"monthly_stats": [{"month": "2025-10"}]},
+    }))
+    return str(path)
+
+
+def names(store):
+    return {record["id"]: record["name"] for record in store.rows("customers")}
+
+
+def test_writes_are_replayed_from_the_log(data_path):
+    store = DataStore(data_path)
+    added = store.insert("customers", {**CUSTOMER, "name": "Sari"})
+    store.update("customers", 1, {"name": "Budi S."})
+
+    reloaded = DataStore(data_path)
+    assert names(reloaded) == {1: "Budi S.", added["id"]: "Sari"}
+    assert reloaded.analytics()["active_customers"] == 2
+    assert reloaded.insert("customers", CUSTOMER)["id"] == added["id"] + 1
+
+
+def test_torn_tail_is_cut_off(data_path):
+    store = DataStore(data_path)
+    store.insert("customers", {**CUSTOMER, "name": "Sari"})
+    with open(store.wal_path, "a", encoding="utf-8") as f:
+        f.write('{"table": "customers", "record": {"id": 3, "na')
+
+    reloaded = DataStore(data_path)
+    assert names(reloaded) == {1: "Budi", 2: "Sari"}
+    # New entries land on a clean line after the cut
+    reloaded.insert("customers", {**CUSTOMER, "name": "Andi"})
+    assert names(DataStore(data_path)) == {1: "Budi", 2: "Sari", 3: "Andi"}
+
+
+def test_compaction_folds_the_log_into_the_snapshot(data_path):
+    store = DataStore(data_path)
+    store.insert("customers", {**CUSTOMER, "name": "Sari"})
+    store.compact()
+
+    with open(data_path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert [c["name"] for c in snapshot["customers"]] == ["Budi", "Sari"]
+    assert snapshot["analytics"]["monthly_stats"] == [{"month": "2025-10"}]
+    assert os.path.getsize(store.wal_path) == 0
+    assert not os.path.exists(store.old_wal_path)
+    assert names(DataStore(data_path)) == {1: "Budi", 2: "Sari"}
+
+
+def test_compaction_without_writes_leaves_the_snapshot_alone(data_path):
+    before = os.stat(data_path).st_mtime_ns
+    DataStore(data_path).compact()
+    assert os.stat(data_path).st_mtime_ns == before
+
+
+def test_compaction_runs_in_the_background_after_compact_every_writes(data_path):
+    store = DataStore(data_path, compact_every=3)
+    for i in range(3):
+        store.insert("customers", {**CUSTOMER, "name": f"c{i}"})
+    for _ in range(100):
+        if not os.path.exists(store.old_wal_path) and os.path.getsize(store.wal_path) == 0:
+            break
+        time.sleep(0.01)
+    with open(data_path, encoding="utf-8") as f:
+        assert len(json.load(f)["customers"]) == 4
+
+
+def test_interrupted_compaction_is_recovered(data_path):
+    store = DataStore(data_path)
+    store.insert("customers", {**CUSTOMER, "name": "Sari"})
+    # Crash after rotating the log but before the snapshot was written
+    with store._lock:
+        store._rotate_wal()
+    store.update("customers", 2, {"name": "Sari W."})
+
+    reloaded = DataStore(data_path)
+    assert names(reloaded) == {1: "Budi", 2: "Sari W."}
+
+    # The next compaction keeps the leftover segment's entries
+    reloaded.insert("customers", {**CUSTOMER, "name": "Andi"})
+    reloaded.compact()
+    assert not os.path.exists(reloaded.old_wal_path)
+    assert names(DataStore(data_path)) == {1: "Budi", 2: "Sari W.", 3: "Andi"}
+
+
+def test_old_segment_is_replayed_after_a_swapped_snapshot(data_path):
+    store = DataStore(data_path)
+    store.insert("customers", {**CUSTOMER, "name": "Sari"})
+    store.update("customers", 2, {"name": "Sari W."})
+    # Crash after the snapshot swap but before the old segment was deleted
+    old_wal = open(store.wal_path, "rb").read()
+    store.compact()
+    with open(store.old_wal_path, "wb") as f:
+        f.write(old_wal)
+    store.update("customers", 2, {"plan": "Pro"})
+
+    reloaded = DataStore(data_path)
+    assert reloaded.get("customers", 2) == {**CUSTOMER, "id": 2, "name": "Sari W.", "plan": "Pro"}
+
+
+def test_scan_reads_in_id_order_across_slices(data_path):
+    store = DataStore(data_path)
+    store.put_many("customers", [{**CUSTOMER, "id": 10, "name": "j"}, {**CUSTOMER, "id": 5, "name": "e"}])
+    store.put_many("customers", [{**CUSTOMER, "name": f"n{i}", "status": "Inactive" if i % 2 else "Active"} for i in range(5)])
+
+    ids = [record["id"] for record in store.scan("customers", batch=2)]
+    assert ids == sorted(record["id"] for record in store.rows("customers"))
+    assert [r["id"] for r in store.scan("customers", {"status": "Inactive"}, batch=3)] == [12, 14]
@@ -1,6 +1,5 @@
 import streamlit as st
 import requests
-import json
 
 # Page config
 st.set_page_config(
@@ -12,6 +11,23 @@ st.set_page_config(
 # API endpoint
 API_URL = "http://localhost:8001"
 
+
+def browser_address():
+    """The user's address, so the backend throttles logins per browser rather than per Streamlit server"""
+    headers = st.context.headers
+    forwarded = headers.get("X-Forwarded-For") or headers.get("X-Real-Ip")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    # Served directly: take the address of the browser's websocket connection
+    try:
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        client = Runtime.instance().get_client(get_script_run_ctx().session_id)
+        return client.request.remote_ip
+    except Exception:
+        return None
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -71,6 +87,8 @@ if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "user" not in st.session_state:
     st.session_state.user = None
+if "token" not in st.session_state:
+    st.session_state.token = None
 
 if st.session_state.logged_in:
     st.success(f"Already logged in as {st.session_state.user['name']}")
@@ -78,6 +96,7 @@ if st.session_state.logged_in:
     if st.button("Logout"):
         st.session_state.logged_in = False
         st.session_state.user = None
+        st.session_state.token = None
         st.rerun()
 else:
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -99,9 +118,11 @@ else:
                 else:
                     try:
                         # Call login API
+                        address = browser_address()
                         response = requests.post(
                             f"{API_URL}/login",
-                            json={"email": email, "password": password}
+                            json={"email": email, "password": password},
+                            headers={"X-Forwarded-For": address} if address else None
                         )
                         
                         if response.status_code == 200:
@@ -109,11 +130,14 @@ else:
                             if data["success"]:
                                 st.session_state.logged_in = True
                                 st.session_state.user = data["user"]
+                                st.session_state.token = data["access_token"]
                                 st.success(f"Welcome, {data['user']['name']}!")
                                 st.balloons()
                                 st.rerun()
                             else:
                                 st.error(f"{data['message']}")
+                        elif response.status_code == 429:
+                            st.error("Too many failed attempts. Please wait a few minutes and try again.")
                         else:
                             st.error("Server error. Please try again.")
                     except requests.exceptions.ConnectionError:
@@ -1,6 +1,5 @@
 import streamlit as st
 import requests
-import json
 from datetime import datetime
 
 # Page
@@ -62,11 +61,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
+if "logged_in" not in st.session_state or not st.session_state.logged_in or not st.session_state.get("token"):
     st.warning("lease login first")
     st.info("Go to Login page from the sidebar")
     st.stop()
 
+headers = {"Authorization": f"Bearer {st.session_state.token}"}
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
@@ -79,6 +80,7 @@ with col2:
     if st.button("Logout", use_container_width=True):
         st.session_state.logged_in = False
         st.session_state.user = None
+        st.session_state.token = None
         st.session_state.messages = []
         st.rerun()
 st.markdown('</div>', unsafe_allow_html=True)
@@ -118,7 +120,8 @@ with st.sidebar:
                 with st.spinner("Thinking..."):
                     response = requests.post(
                         f"{API_URL}/chat",
-                        json={"question": question, "model": model}
+                        json={"question": question, "model": model},
+                        headers=headers
                     )
                     
                     if response.status_code == 200:
@@ -146,7 +149,7 @@ with st.sidebar:
     # Stats
     st.header("Quick Stats")
     try:
-        analytics = requests.get(f"{API_URL}/analytics").json()
+        analytics = requests.get(f"{API_URL}/analytics", headers=headers).json()
         st.metric("Active Customers", analytics.get("active_customers", 0))
         st.metric("Avg Rating", f"{analytics.get('average_rating', 0)}/5")
         st.metric("Total Feedback", analytics.get("total_feedback", 0))
@@ -199,6 +202,7 @@ if user_input:
             response = requests.post(
                 f"{API_URL}/chat",
                 json={"question": user_input, "model": model},
+                headers=headers,
                 timeout=30
             )
             
@@ -210,7 +214,12 @@ if user_input:
                     "timestamp": datetime.now().strftime("%H:%M")
                 })
             else:
-                st.error(f"API Error: {response.status_code}")
+                if response.status_code == 401:
+                    st.error("Session expired. Please login again.")
+                elif response.status_code == 429:
+                    st.error(f"Too many requests. Please wait {response.headers.get('Retry-After', 'a few')} seconds.")
+                else:
+                    st.error(f"API Error: {response.status_code}")
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": "Sorry, I encountered an error. Please try again.",
@@ -1,8 +1,6 @@
+import os
 import streamlit as st
 import requests
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 
 # Page config
@@ -13,6 +11,9 @@ st.set_page_config(
 )
 
 API_URL = "http://localhost:8001"
+# Download links are opened by the browser, which may not reach API_URL
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", API_URL)
+TABLE_ROWS = 100
 
 # Custom CSS
 st.markdown("""
@@ -53,11 +54,18 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
+if "logged_in" not in st.session_state or not st.session_state.logged_in or not st.session_state.get("token"):
     st.warning("Please login first")
     st.info("Go to Login page from the sidebar")
     st.stop()
 
+headers = {"Authorization": f"Bearer {st.session_state.token}"}
+
+# pandas and plotly are slow to import; load them only once the page will render
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
 st.markdown('<div class="header-container">', unsafe_allow_html=True)
 col1, col2 = st.columns([3, 1])
 with col1:
@@ -70,12 +78,23 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # Fetch data
 try:
-    analytics_response = requests.get(f"{API_URL}/analytics", timeout=5)
-    customers_response = requests.get(f"{API_URL}/customers", timeout=5)
-    feedback_response = requests.get(f"{API_URL}/feedback", timeout=5)
+    # Charts come pre-aggregated from the backend and tables only show the
+    # latest rows, so page time does not grow with the size of the dataset
+    analytics_response = requests.get(f"{API_URL}/analytics", headers=headers, timeout=5)
+    charts_response = requests.get(
+        f"{API_URL}/charts",
+        params={"granularity": st.session_state.get("granularity", "month"), "points": 120},
+        headers=headers,
+        timeout=5
+    )
+    customers_response = requests.get(f"{API_URL}/customers", params={"limit": TABLE_ROWS}, headers=headers, timeout=5)
+    feedback_response = requests.get(f"{API_URL}/feedback", params={"limit": TABLE_ROWS}, headers=headers, timeout=5)
     
-    if analytics_response.status_code == 200 and customers_response.status_code == 200:
+    # The chart series are built right after the backend starts; 503 means not yet
+    charts_pending = charts_response.status_code == 503
+    if analytics_response.status_code == 200 and (charts_response.status_code == 200 or charts_pending) and customers_response.status_code == 200:
         analytics = analytics_response.json()
+        charts = None if charts_pending else charts_response.json()
         customers = customers_response.json()
         feedback = feedback_response.json()
 
@@ -139,19 +158,22 @@ try:
         
         with col1:
             # Customer Status Distribution
-            status_data = df_customers['status'].value_counts()
-            fig_status = go.Figure(data=[go.Pie(
-                labels=status_data.index,
-                values=status_data.values,
-                hole=0.4,
-                marker_colors=['#10b981', '#ef4444']
-            )])
-            fig_status.update_layout(
-                title="Customer Status Distribution",
-                height=350,
-                showlegend=True
-            )
-            st.plotly_chart(fig_status, use_container_width=True)
+            if charts_pending:
+                st.info("Charts are being prepared, refresh in a moment...")
+            else:
+                status_data = charts['histograms']['customer_status']
+                fig_status = go.Figure(data=[go.Pie(
+                    labels=list(status_data.keys()),
+                    values=list(status_data.values()),
+                    hole=0.4,
+                    marker_colors=['#10b981', '#ef4444']
+                )])
+                fig_status.update_layout(
+                    title="Customer Status Distribution",
+                    height=350,
+                    showlegend=True
+                )
+                st.plotly_chart(fig_status, use_container_width=True)
         
         with col2:
             # Customers by Plan
@@ -178,18 +200,21 @@ try:
         col1, col2 = st.columns(2)
         
         with col1:
-            # Rating Distribution
-            rating_data = df_feedback['rating'].value_counts().sort_index()
-            fig_rating = px.bar(
-                x=rating_data.index,
-                y=rating_data.values,
-                title="Feedback Rating Distribution",
-                labels={'x': 'Rating', 'y': 'Count'},
-                color=rating_data.values,
-                color_continuous_scale=['#ef4444', '#f59e0b', '#10b981']
-            )
-            fig_rating.update_layout(height=350, showlegend=False)
-            st.plotly_chart(fig_rating, use_container_width=True)
+            if charts_pending:
+                st.info("Charts are being prepared, refresh in a moment...")
+            else:
+                # Rating Distribution
+                rating_data = charts['histograms']['feedback_rating']
+                fig_rating = px.bar(
+                    x=[int(rating) for rating in rating_data],
+                    y=list(rating_data.values()),
+                    title="Feedback Rating Distribution",
+                    labels={'x': 'Rating', 'y': 'Count'},
+                    color=list(rating_data.values()),
+                    color_continuous_scale=['#ef4444', '#f59e0b', '#10b981']
+                )
+                fig_rating.update_layout(height=350, showlegend=False)
+                st.plotly_chart(fig_rating, use_container_width=True)
         
         with col2:
             # Feedback by Category
@@ -213,8 +238,51 @@ try:
             fig_category.update_layout(height=350, showlegend=False)
             st.plotly_chart(fig_category, use_container_width=True)
         
+        st.markdown("### Trends")
+        
+        st.selectbox(
+            "Granularity",
+            ["day", "week", "month"],
+            index=2,
+            key="granularity"
+        )
+        if charts_pending:
+            st.info("Trends are being prepared, refresh in a moment...")
+        else:
+            timeseries = charts['timeseries']
+        
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                # Signups, activity and feedback volume per period
+                fig_activity = go.Figure()
+                fig_activity.add_trace(go.Scatter(x=timeseries['t'], y=timeseries['signups'], name="New Customers", line_color='#667eea'))
+                fig_activity.add_trace(go.Scatter(x=timeseries['t'], y=timeseries['last_active'], name="Last Active", line_color='#10b981'))
+                fig_activity.add_trace(go.Scatter(x=timeseries['t'], y=timeseries['feedback'], name="Feedback", line_color='#8b5cf6'))
+                fig_activity.update_layout(title="Customer Activity", height=350)
+                st.plotly_chart(fig_activity, use_container_width=True)
+        
+            with col2:
+                # Average rating per period
+                fig_trend = px.line(
+                    x=timeseries['t'],
+                    y=timeseries['avg_rating'],
+                    title="Average Rating Trend",
+                    labels={'x': 'Period', 'y': 'Avg Rating'},
+                    markers=True
+                )
+                fig_trend.update_traces(line_color='#f59e0b', connectgaps=True)
+                fig_trend.update_layout(height=350, yaxis_range=[0, 5])
+                st.plotly_chart(fig_trend, use_container_width=True)
+        
         # Data Tables
         st.markdown("### Recent Data")
+        st.caption(f"Showing the {TABLE_ROWS} most recent entries. Download for the full data.")
+        
+        # Download links carry a token that is only accepted by /export and
+        # expires with the session
+        export_token_response = requests.post(f"{API_URL}/export/token", headers=headers, timeout=5)
+        export_token = export_token_response.json()["access_token"] if export_token_response.status_code == 200 else ""
         
         tab1, tab2 = st.tabs(["Customers", "Feedback"])
         
@@ -225,28 +293,40 @@ try:
                 hide_index=True
             )
             
-            # Download button
-            csv = df_customers.to_csv(index=False)
-            st.download_button(
-                label="Download Customer Data (CSV)",
-                data=csv,
-                file_name=f"customers_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+            # Download link, streamed straight from the backend
+            st.link_button(
+                "Download Customer Data (CSV)",
+                f"{PUBLIC_API_URL}/export/customers?access_token={export_token}"
             )
         
         with tab2:
+            search_query = st.text_input("Search feedback", placeholder="e.g. layanan lambat, harga*")
+            if search_query:
+                search_response = requests.get(
+                    f"{API_URL}/feedback/search",
+                    params={"q": search_query, "limit": TABLE_ROWS},
+                    headers=headers,
+                    timeout=5
+                )
+                if search_response.status_code == 200:
+                    search_results = search_response.json()
+                    st.caption(f"{search_results['total']} matching entries")
+                    df_feedback = pd.DataFrame(
+                        search_results['results'],
+                        columns=['user', 'rating', 'comment', 'category', 'status', 'date']
+                    )
+                else:
+                    st.warning(f"Search is unavailable right now (HTTP {search_response.status_code})")
+            
             st.dataframe(
                 df_feedback[['user', 'rating', 'comment', 'category', 'status', 'date']],
                 use_container_width=True,
                 hide_index=True
             )
             
-            csv = df_feedback.to_csv(index=False)
-            st.download_button(
-                label="Download Feedback Data (CSV)",
-                data=csv,
-                file_name=f"feedback_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+            st.link_button(
+                "Download Feedback Data (CSV)",
+                f"{PUBLIC_API_URL}/export/feedback?access_token={export_token}"
             )
         
         # Insights Section
@@ -311,6 +391,33 @@ try:
                 Sentiment: {sentiment}
                 """)
         
+        # Generated insights are precomputed by the backend job queue,
+        # so this only reads whatever is ready for the current data snapshot
+        try:
+            insights = requests.get(f"{API_URL}/insights", headers=headers, timeout=5).json().get("insights", {})
+        except Exception:
+            insights = {}
+        
+        insight_titles = {
+            "churn": "Churn Analysis",
+            "feedback_themes": "Feedback Themes",
+        }
+        generated = [(kind, job) for kind, job in insights.items() if job]
+        if generated:
+            cols = st.columns(len(generated))
+            for col, (kind, job) in zip(cols, generated):
+                with col:
+                    title = insight_titles.get(kind, kind)
+                    if job["status"] == "done":
+                        st.markdown(f"**{title}**")
+                        st.write(job["result"])
+                    elif job["status"] == "failed":
+                        st.caption(f"{title}: unavailable ({job['error']})")
+                    else:
+                        st.caption(f"{title}: generating, refresh in a moment...")
+        
+    elif analytics_response.status_code == 401:
+        st.error("Session expired. Please login again.")
     else:
         st.error("Failed to fetch data from API")
         